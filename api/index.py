@@ -1 +1,10 @@
-from backend.app.main import app
+"""
+Vercel（サーバーレス）のエントリポイント
+起動コマンドで python manage.py migrate を実行できないため、コールドスタート時にマイグレーションを適用する
+（適用済みなら alembic_version の確認のみ）
+"""
+from backend.manage import upgrade_schema
+
+upgrade_schema()
+
+from backend.app.main import app  # noqa: E402
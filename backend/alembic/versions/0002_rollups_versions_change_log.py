@@ -0,0 +1,106 @@
+"""rollups, data versions, change log
+
+売上ロールアップ・データバージョン・変更ログの各テーブルと日付インデックスを追加
+途中まで create_all で作られたDBもあるため、既に存在するテーブル・インデックスは作成しない
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:02:41.187306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DATE_INDEXES = [
+    ('ix_routes_date', 'routes', ['date']),
+    ('ix_visits_date', 'visits', ['date']),
+    ('ix_revenues_date', 'revenues', ['date']),
+    ('ix_visit_changes_staff_id', 'visit_changes', ['staff_id']),
+    ('ix_visit_changes_old_staff_id', 'visit_changes', ['old_staff_id']),
+]
+
+
+def _existing_tables() -> set:
+    if op.get_context().as_sql:  # --sql（オフライン）ではDBを参照できない
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _existing_indexes(table: str) -> set:
+    if op.get_context().as_sql:
+        return set()
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    tables = _existing_tables()
+
+    if 'staff_revenue_daily' not in tables:
+        op.create_table('staff_revenue_daily',
+        sa.Column('staff_id', sa.String(length=36), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('amount', sa.Integer(), nullable=False),
+        sa.Column('visit_count', sa.Integer(), nullable=False),
+        sa.Column('duration_minutes', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['staff_id'], ['staff.staff_id'], ),
+        sa.PrimaryKeyConstraint('staff_id', 'date')
+        )
+    if 'staff_revenue_monthly' not in tables:
+        op.create_table('staff_revenue_monthly',
+        sa.Column('staff_id', sa.String(length=36), nullable=False),
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('amount', sa.Integer(), nullable=False),
+        sa.Column('visit_count', sa.Integer(), nullable=False),
+        sa.Column('duration_minutes', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['staff_id'], ['staff.staff_id'], ),
+        sa.PrimaryKeyConstraint('staff_id', 'month')
+        )
+    if 'data_versions' not in tables:
+        op.create_table('data_versions',
+        sa.Column('key', sa.String(length=20), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+        )
+    if 'visit_changes' not in tables:
+        op.create_table('visit_changes',
+        sa.Column('change_id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('entity', sa.String(length=10), nullable=False),
+        sa.Column('entity_id', sa.String(length=36), nullable=False),
+        sa.Column('operation', sa.String(length=10), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('staff_id', sa.String(length=36), nullable=True),
+        sa.Column('old_staff_id', sa.String(length=36), nullable=True),
+        sa.Column('changed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('change_id')
+        )
+
+    for name, table, columns in DATE_INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns, unique=False)
+
+    if 'staff_revenue_daily' not in tables and not op.get_context().as_sql:
+        # 既存の売上からロールアップを作成（以降は訪問完了時に差分更新）
+        from app.revenue_rollup import rebuild_rollups
+        rebuild_rollups(Session(bind=op.get_bind()))
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(DATE_INDEXES):
+        op.drop_index(name, table_name=table)
+    op.drop_table('visit_changes')
+    op.drop_table('data_versions')
+    op.drop_table('staff_revenue_monthly')
+    op.drop_table('staff_revenue_daily')
@@ -0,0 +1,197 @@
+"""
+分析用の訪問・売上データ一括出力（CSV / Parquet）
+
+- 訪問1件1行に、主担当・同行スタッフ、利用者属性、売上（主担当分・同行分。管理者のみ）を結合して出力する
+- サーバーサイドカーソル（yield_per / stream_results）で CHUNK_SIZE 行ずつ取得し、
+  チャンク単位でシリアライズして送るため、期間が数年分でもメモリ使用量は一定
+- Parquet は pyarrow がインストールされている場合のみ利用可能（1チャンク＝1行グループ）
+- StreamingResponse の本体はリクエストのDBセッション終了後に実行されるため、専用のセッションを開く
+"""
+import csv
+import io
+from datetime import date
+from typing import Iterator, List, Tuple
+from sqlalchemy import and_, select
+from sqlalchemy.orm import aliased
+from app import models
+from app.database import ReadSessionLocal
+from app.date_filters import date_range_filter
+
+CHUNK_SIZE = 5000
+
+# (列名, Parquet型)
+EXPORT_COLUMNS: List[Tuple[str, str]] = [
+    ("visit_id", "string"),
+    ("date", "date"),
+    ("scheduled_start", "timestamp"),
+    ("scheduled_end", "timestamp"),
+    ("actual_start", "timestamp"),
+    ("actual_end", "timestamp"),
+    ("status", "string"),
+    ("service_type", "string"),
+    ("visit_type", "string"),
+    ("staff_id", "string"),
+    ("staff_name", "string"),
+    ("companion_staff_id", "string"),
+    ("companion_name", "string"),
+    ("client_id", "string"),
+    ("client_name", "string"),
+    ("care_level", "string"),
+    ("client_service_type", "string"),
+]
+
+# 売上の列（管理者のみ。売上明細APIと同じ閲覧範囲）
+REVENUE_COLUMNS: List[Tuple[str, str]] = [
+    ("revenue_amount", "int"),
+    ("revenue_duration_minutes", "int"),
+    ("service_unit_price", "int"),
+    ("companion_revenue_amount", "int"),
+]
+
+
+def export_columns(include_revenue: bool) -> List[Tuple[str, str]]:
+    return EXPORT_COLUMNS + REVENUE_COLUMNS if include_revenue else EXPORT_COLUMNS
+
+
+def _export_statement(start_date: date, end_date: date, include_revenue: bool):
+    staff = aliased(models.Staff)
+    companion = aliased(models.Staff)
+    end_exclusive = date.fromordinal(end_date.toordinal() + 1)
+
+    statement = select(
+        models.Visit.visit_id,
+        models.Visit.date,
+        models.Visit.scheduled_start,
+        models.Visit.scheduled_end,
+        models.Visit.actual_start,
+        models.Visit.actual_end,
+        models.Visit.status,
+        models.Visit.service_type,
+        models.Visit.visit_type,
+        models.Visit.staff_id,
+        staff.name,
+        models.Visit.companion_staff_id,
+        companion.name,
+        models.Visit.client_id,
+        models.Client.name,
+        models.Client.care_level,
+        models.Client.service_type,
+    ).outerjoin(
+        staff, staff.staff_id == models.Visit.staff_id
+    ).outerjoin(
+        companion, companion.staff_id == models.Visit.companion_staff_id
+    ).outerjoin(
+        models.Client, models.Client.client_id == models.Visit.client_id
+    )
+
+    if include_revenue:
+        revenue = aliased(models.Revenue)
+        companion_revenue = aliased(models.Revenue)
+        statement = statement.add_columns(
+            revenue.amount,
+            revenue.duration_minutes,
+            revenue.service_unit_price,
+            companion_revenue.amount
+        ).outerjoin(
+            revenue, and_(revenue.visit_id == models.Visit.visit_id, revenue.staff_id == models.Visit.staff_id)
+        ).outerjoin(
+            companion_revenue, and_(
+                companion_revenue.visit_id == models.Visit.visit_id,
+                companion_revenue.staff_id == models.Visit.companion_staff_id
+            )
+        )
+
+    return statement.where(
+        date_range_filter(models.Visit.date, start_date, end_exclusive)
+    ).order_by(
+        models.Visit.date, models.Visit.scheduled_start, models.Visit.visit_id
+    ).execution_options(yield_per=CHUNK_SIZE)
+
+
+def _iter_chunks(start_date: date, end_date: date, include_revenue: bool) -> Iterator[list]:
+    """期間内（両端含む）の出力行を CHUNK_SIZE 行ずつ返す"""
+    db = ReadSessionLocal()
+    try:
+        result = db.execute(_export_statement(start_date, end_date, include_revenue))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def stream_csv(start_date: date, end_date: date, include_revenue: bool) -> Iterator[bytes]:
+    """CSV（UTF-8、ヘッダー行付き）をチャンク単位で返す"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow([name for name, _ in export_columns(include_revenue)])
+    yield buffer.getvalue().encode("utf-8")
+
+    for rows in _iter_chunks(start_date, end_date, include_revenue):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _DrainBuffer:
+    """pyarrowの出力先。書き込まれたバイト列をチャンクごとに取り出す"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, b) -> int:
+        self.buffer += b
+        self.position += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def stream_parquet(start_date: date, end_date: date, include_revenue: bool) -> Iterator[bytes]:
+    """Parquet をチャンク（行グループ）単位で返す（要 pyarrow）"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        "string": pa.string(),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("us"),
+        "int": pa.int64(),
+    }
+    schema = pa.schema([(name, types[type_name]) for name, type_name in export_columns(include_revenue)])
+
+    sink = _DrainBuffer()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for rows in _iter_chunks(start_date, end_date, include_revenue):
+            columns = list(zip(*rows))
+            writer.write_batch(pa.record_batch(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -1,15 +1,18 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db
+from app.response_cache import LocalCacheBackend
 from app import models
 
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=settings.password_schemes.split(","), deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
@@ -23,15 +26,33 @@ def get_password_hash(password: str) -> str:
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
+    to_encode.update({"exp": expire, "iat": now})
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 
-def get_current_user(
+@dataclass(frozen=True)
+class Principal:
+    """認証済みユーザー（有効なスタッフとしてDBで確認済みの値）"""
+    staff_id: str
+    role: str
+    name: str
+
+
+# staff_id（タグ）×トークン発行時刻 → Principal のTTL付きLRU（レスポンスキャッシュと同じ実装）
+# スタッフの更新・削除時は invalidate(staff_id) で即時破棄する（他ワーカー分はTTLで失効）
+principal_cache = LocalCacheBackend(settings.principal_cache_max_entries, settings.principal_cache_ttl)
+
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> models.Staff:
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    JWTを検証して認証済みユーザーを返す
+    スタッフの有効性・ロールはDBで確認し、結果を principal_cache に保持する（ヒット時はDBアクセスなし）
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="認証情報が無効です",
@@ -45,16 +66,25 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    staff = db.query(models.Staff).filter(
-        models.Staff.staff_id == staff_id,
-        models.Staff.is_active == True
-    ).first()
+    issued_at = str(payload.get("iat") or 0)
+    principal = principal_cache.get(staff_id, issued_at)
+    if principal is not None:
+        return principal
+
+    staff = (await db.execute(
+        select(models.Staff.staff_id, models.Staff.role, models.Staff.name).where(
+            models.Staff.staff_id == staff_id,
+            models.Staff.is_active == True
+        )
+    )).first()
     if staff is None:
         raise credentials_exception
-    return staff
+    principal = Principal(staff_id=str(staff.staff_id), role=staff.role, name=staff.name)
+    principal_cache.set(staff_id, issued_at, principal)
+    return principal
 
 
-def require_admin(current_user: models.Staff = Depends(get_current_user)) -> models.Staff:
+async def require_admin(current_user: Principal = Depends(get_current_user)) -> Principal:
     if current_user.role != models.RoleEnum.admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -63,7 +93,7 @@ def require_admin(current_user: models.Staff = Depends(get_current_user)) -> mod
     return current_user
 
 
-def require_coordinator_or_above(current_user: models.Staff = Depends(get_current_user)) -> models.Staff:
+async def require_coordinator_or_above(current_user: Principal = Depends(get_current_user)) -> Principal:
     if current_user.role not in [models.RoleEnum.admin, models.RoleEnum.coordinator]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
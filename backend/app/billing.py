@@ -0,0 +1,232 @@
+"""
+月次介護報酬（請求）計算エンジン
+
+- 報酬単位表はバージョン（改定年月）ごとに定義し、numpy配列に展開して保持する
+    units[サービス種別, 時間区分] / 時間区分の境界（分） / 時刻別加算率[0..23]
+- 1か月分の完了訪問を配列化し、単位数の算定から利用者別・スタッフ別集計までを一括で計算する
+- 金額 = 単位数 × 地域区分単価（円未満切り捨て、利用者ごとに月合計で算定）
+
+※ 単位数は事業所の請求ソフトと突き合わせたうえで改定時に追加・更新すること
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import numpy as np
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+from app.date_filters import date_range_filter, month_range
+
+# 配列の行順（サービス種別）
+SERVICE_TYPES = [s.value for s in models.ServiceTypeEnum]
+
+# 2人体制（2人の訪問介護員等による場合）は所定単位数の200%
+TWO_STAFF_MULTIPLIER = 2.0
+
+# 地域区分別 1単位の単価（円）訪問介護（人件費割合70%）
+AREA_UNIT_PRICES = {
+    "1級地": 11.40,
+    "2級地": 11.12,
+    "3級地": 11.05,
+    "4級地": 10.84,
+    "5級地": 10.70,
+    "6級地": 10.42,
+    "7級地": 10.21,
+    "その他": 10.00,
+}
+
+
+@dataclass
+class RateTableDefinition:
+    """報酬単位表の定義（改定ごとに1件追加する）"""
+    version: str
+    effective_from: date
+    # 時間区分の下限（分）。区分iは band_starts[i] 分以上 band_starts[i+1] 分未満
+    band_starts: List[int]
+    # サービス種別 → 時間区分ごとの所定単位数（0は算定不可）
+    units: Dict[str, List[int]]
+    # 開始時刻による加算率（早朝・夜間25%、深夜50%）
+    time_surcharges: Dict[Tuple[int, int], float] = field(default_factory=lambda: {
+        (6, 8): 0.25,    # 早朝 6:00〜8:00
+        (18, 22): 0.25,  # 夜間 18:00〜22:00
+        (22, 24): 0.50,  # 深夜 22:00〜翌6:00
+        (0, 6): 0.50,
+    })
+
+
+RATE_TABLE_DEFINITIONS = [
+    RateTableDefinition(
+        version="2024-06",
+        effective_from=date(2024, 6, 1),
+        #            <20  20-  30-  45-  60-  90- 120- 150-
+        band_starts=[0, 20, 30, 45, 60, 90, 120, 150],
+        units={
+            "身体": [163, 244, 387, 387, 567, 649, 731, 813],
+            "家事": [0, 179, 179, 220, 220, 220, 220, 220],
+            "生活": [0, 179, 179, 220, 220, 220, 220, 220],
+            "重度": [186, 186, 186, 186, 277, 369, 461, 553],
+            "障がい": [256, 256, 404, 404, 587, 669, 754, 754],
+        },
+    ),
+]
+
+
+class RateTable:
+    """単位表を配列化したもの"""
+
+    def __init__(self, definition: RateTableDefinition):
+        self.version = definition.version
+        self.band_starts = np.asarray(definition.band_starts, dtype=np.int32)
+        self.units = np.zeros((len(SERVICE_TYPES), len(definition.band_starts)), dtype=np.int32)
+        for service_type, units in definition.units.items():
+            self.units[SERVICE_TYPES.index(service_type)] = units
+        self.hour_multipliers = np.ones(24, dtype=np.float64)
+        for (start_hour, end_hour), rate in definition.time_surcharges.items():
+            self.hour_multipliers[start_hour:end_hour] += rate
+
+    def visit_units(
+        self,
+        service_idx: np.ndarray,
+        minutes: np.ndarray,
+        start_hours: np.ndarray,
+        two_staff: np.ndarray,
+    ) -> np.ndarray:
+        """訪問ごとの算定単位数（加算後、四捨五入）"""
+        band_idx = np.searchsorted(self.band_starts, minutes, side="right") - 1
+        base = self.units[service_idx, np.clip(band_idx, 0, None)]
+        multiplier = self.hour_multipliers[start_hours] * np.where(two_staff, TWO_STAFF_MULTIPLIER, 1.0)
+        return np.floor(base * multiplier + 0.5).astype(np.int64)
+
+
+@lru_cache(maxsize=None)
+def get_rate_table(target_month: date) -> RateTable:
+    """対象月に適用される単位表（改定月以降で最新のもの）"""
+    applicable = [d for d in RATE_TABLE_DEFINITIONS if d.effective_from <= target_month]
+    if not applicable:
+        applicable = RATE_TABLE_DEFINITIONS[:1]
+    return RateTable(max(applicable, key=lambda d: d.effective_from))
+
+
+def area_unit_price(area_grade: str) -> float:
+    """地域区分の1単位単価。未定義の区分は ValueError（既定単価で請求しない）"""
+    if area_grade not in AREA_UNIT_PRICES:
+        raise ValueError(f"地域区分「{area_grade}」の単価が定義されていません")
+    return AREA_UNIT_PRICES[area_grade]
+
+
+def calculate_monthly_billing(db: Session, target_month: str) -> dict:
+    """
+    指定月（YYYY-MM）の完了訪問から利用者別・スタッフ別の介護報酬を計算
+    単位表にないサービス種別・未定義の地域区分は ValueError（身体介護等の単価で代替しない）
+    """
+    first_day, end_day = month_range(target_month)
+    rate_table = get_rate_table(first_day)
+    unit_price = area_unit_price(settings.billing_area_grade)
+
+    visits = db.query(
+        models.Visit.client_id,
+        models.Visit.staff_id,
+        models.Visit.companion_staff_id,
+        models.Visit.visit_type,
+        models.Visit.service_type,
+        models.Visit.scheduled_start,
+        models.Visit.scheduled_end,
+        models.Visit.actual_start,
+        models.Visit.actual_end
+    ).filter(
+        and_(
+            date_range_filter(models.Visit.date, first_day, end_day),
+            models.Visit.status == models.VisitStatusEnum.completed
+        )
+    ).all()
+
+    # 利用者・スタッフを連番に置き換えて配列化
+    client_ids: Dict[str, int] = {}
+    staff_ids: Dict[str, int] = {}
+    n = len(visits)
+    client_idx = np.empty(n, dtype=np.int32)
+    staff_idx = np.full(n, -1, dtype=np.int32)
+    companion_idx = np.full(n, -1, dtype=np.int32)
+    service_idx = np.empty(n, dtype=np.int8)
+    minutes = np.empty(n, dtype=np.int32)
+    start_hours = np.empty(n, dtype=np.int8)
+    two_staff = np.zeros(n, dtype=bool)
+
+    for i, v in enumerate(visits):
+        start = v.actual_start or v.scheduled_start
+        end = v.actual_end if v.actual_start and v.actual_end else v.scheduled_end
+        client_idx[i] = client_ids.setdefault(str(v.client_id), len(client_ids))
+        if v.staff_id:
+            staff_idx[i] = staff_ids.setdefault(str(v.staff_id), len(staff_ids))
+        if v.companion_staff_id and v.visit_type == "two_staff":
+            companion_idx[i] = staff_ids.setdefault(str(v.companion_staff_id), len(staff_ids))
+            two_staff[i] = True
+        if v.service_type not in SERVICE_TYPES:
+            raise ValueError(f"サービス種別「{v.service_type}」は報酬単位表にありません")
+        service_idx[i] = SERVICE_TYPES.index(v.service_type)
+        minutes[i] = int((end - start).total_seconds() // 60)
+        start_hours[i] = start.hour
+
+    units = rate_table.visit_units(service_idx, minutes, start_hours, two_staff)
+
+    # 利用者別（請求単位）
+    client_units = np.bincount(client_idx, weights=units, minlength=len(client_ids)).astype(np.int64)
+    client_visits = np.bincount(client_idx, minlength=len(client_ids))
+    client_amounts = np.floor(client_units * unit_price).astype(np.int64)
+
+    # スタッフ別（2人体制は主担当・同行で折半）
+    staff_units = np.zeros(len(staff_ids), dtype=np.float64)
+    staff_visits = np.zeros(len(staff_ids), dtype=np.int64)
+    share = np.where(two_staff, units / 2, units)
+    primary = staff_idx >= 0
+    np.add.at(staff_units, staff_idx[primary], share[primary])
+    np.add.at(staff_visits, staff_idx[primary], 1)
+    companion = companion_idx >= 0
+    np.add.at(staff_units, companion_idx[companion], share[companion])
+    np.add.at(staff_visits, companion_idx[companion], 1)
+
+    client_names = dict(db.query(models.Client.client_id, models.Client.name).filter(
+        models.Client.client_id.in_(list(client_ids))
+    ).all()) if client_ids else {}
+    staff_names = dict(db.query(models.Staff.staff_id, models.Staff.name).filter(
+        models.Staff.staff_id.in_(list(staff_ids))
+    ).all()) if staff_ids else {}
+
+    clients = [
+        {
+            "client_id": cid,
+            "client_name": client_names.get(cid, "不明"),
+            "visit_count": int(client_visits[i]),
+            "units": int(client_units[i]),
+            "amount": int(client_amounts[i]),
+        }
+        for cid, i in client_ids.items()
+    ]
+    clients.sort(key=lambda x: x["amount"], reverse=True)
+
+    staff = [
+        {
+            "staff_id": sid,
+            "staff_name": staff_names.get(sid, "不明"),
+            "visit_count": int(staff_visits[i]),
+            "units": int(round(staff_units[i])),
+            "amount": int(staff_units[i] * unit_price),
+        }
+        for sid, i in staff_ids.items()
+    ]
+    staff.sort(key=lambda x: x["amount"], reverse=True)
+
+    return {
+        "month": target_month,
+        "rate_version": rate_table.version,
+        "area_grade": settings.billing_area_grade,
+        "unit_price": unit_price,
+        "visit_count": n,
+        "total_units": int(client_units.sum()),
+        "total_amount": int(client_amounts.sum()),
+        "clients": clients,
+        "staff": staff,
+        "calculated_at": datetime.utcnow(),
+    }
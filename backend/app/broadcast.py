@@ -0,0 +1,163 @@
+"""
+進捗差分のプッシュ配信（Server-Sent Events用ブロードキャスター）
+
+- 書き込み側（同期ハンドラ・スレッドプール上）から publish() を呼ぶ
+- 購読側（SSEの非同期ジェネレータ）は subscribe() で得たキューから受信する
+- バックエンドは settings.broadcast_url で切替
+    memory://          プロセス内のみ（単一ワーカー・テスト用）
+    redis://host:6379  Redis Pub/Sub 経由で複数ワーカー間に配信
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Optional, Set
+from app.config import settings
+
+CHANNEL_PREFIX = "ikaruRoute:progress:"
+
+# 購読者1件あたりの未送信メッセージ上限（遅いクライアントは古いものから破棄）
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """1クライアント分の購読。イベントループ外のスレッドからも安全に投入できる"""
+
+    def __init__(self, broadcaster: "Broadcaster", channel: str):
+        self._broadcaster = broadcaster
+        self.channel = channel
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, message: str):
+        self._loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message: str):
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(message)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """次のメッセージを待つ。timeout経過時はNone"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self._broadcaster._unsubscribe(self)
+
+
+class LocalBroadcastBackend:
+    """プロセス内でそのまま購読者へ渡すバックエンド"""
+
+    def start(self, on_message: Callable[[str, str], None]):
+        self._on_message = on_message
+
+    def publish(self, channel: str, message: str):
+        self._on_message(channel, message)
+
+
+class RedisBroadcastBackend:
+    """Redis Pub/Sub 経由で全ワーカーへ配信するバックエンド"""
+
+    def __init__(self, url: str):
+        import redis  # 複数ワーカー構成時のみ必要
+
+        self._client = redis.Redis.from_url(url)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, on_message: Callable[[str, str], None]):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+
+        def listen():
+            for item in pubsub.listen():
+                channel = item["channel"].decode()[len(CHANNEL_PREFIX):]
+                on_message(channel, item["data"].decode())
+
+        self._thread = threading.Thread(target=listen, name="progress-broadcast", daemon=True)
+        self._thread.start()
+
+    def publish(self, channel: str, message: str):
+        self._client.publish(f"{CHANNEL_PREFIX}{channel}", message)
+
+
+class Broadcaster:
+    def __init__(self, backend):
+        self._backend = backend
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _ensure_started(self):
+        with self._lock:
+            if not self._started:
+                self._backend.start(self._dispatch)
+                self._started = True
+
+    def publish(self, channel: str, message: dict):
+        self._ensure_started()
+        self._backend.publish(channel, json.dumps(message, ensure_ascii=False, default=str))
+
+    def subscribe(self, channel: str) -> Subscription:
+        self._ensure_started()
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def _dispatch(self, channel: str, message: str):
+        with self._lock:
+            targets = list(self._subscribers.get(channel, ()))
+        for subscription in targets:
+            subscription.deliver(message)
+
+
+def _create_backend(url: str):
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        return RedisBroadcastBackend(url)
+    return LocalBroadcastBackend()
+
+
+broadcaster = Broadcaster(_create_backend(settings.broadcast_url))
+
+
+def progress_channel(target_date) -> str:
+    return str(target_date)
+
+
+def publish_progress_delta(
+    target_date,
+    visit_id: str,
+    staff_id: Optional[str],
+    old_status: Optional[str],
+    new_status: Optional[str],
+    staff_name: Optional[str] = None,
+    version: Optional[int] = None,
+):
+    """
+    訪問ステータス変化を進捗差分として配信
+    old_status=None は訪問追加、new_status=None は訪問削除を表す
+    version はその変更をコミットした時点の日付側データバージョン（SSEの初期値に含まれる差分の判定用）
+    """
+    if old_status == new_status:
+        return
+    broadcaster.publish(progress_channel(target_date), {
+        "type": "progress_delta",
+        "date": str(target_date),
+        "visit_id": str(visit_id),
+        "staff_id": str(staff_id) if staff_id else None,
+        "staff_name": staff_name,
+        "old_status": old_status,
+        "new_status": new_status,
+        "version": version,
+    })
@@ -0,0 +1,81 @@
+"""
+訪問・ルートの変更ログ（visit_changes）
+
+- 訪問・ルートを書き換える処理は、同じトランザクション内でここの record_* を呼ぶ
+  （commitは呼び出し元。ロールバックされればログも残らない）
+- ログには変更のあった行のIDと担当スタッフのみを記録し、同期時は現在の行を返す
+- 一括取込のように commit まで時間がかかる処理の記録は commit 直前に書き込む
+  （先に採番すると、commit 前のIDを同期クライアントのカーソルが追い越して取りこぼすため）
+"""
+from typing import Iterable, Optional
+from sqlalchemy import event, func, insert
+from sqlalchemy.orm import Session, SessionTransaction
+from app import models
+
+PENDING_KEY = "pending_visit_changes"
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+
+def _str_or_none(value) -> Optional[str]:
+    return str(value) if value else None
+
+
+def record_visit_change(db: Session, visit: models.Visit, old_staff_id=None, deleted: bool = False):
+    """訪問の追加・更新・削除を記録（担当替え時は old_staff_id に旧担当）"""
+    if visit.visit_id is None:
+        db.flush()
+    old_staff_id = _str_or_none(old_staff_id)
+    db.add(models.VisitChange(
+        entity="visit",
+        entity_id=str(visit.visit_id),
+        operation=DELETE if deleted else UPSERT,
+        date=visit.date,
+        staff_id=_str_or_none(visit.staff_id),
+        old_staff_id=old_staff_id if old_staff_id != _str_or_none(visit.staff_id) else None,
+    ))
+
+
+def record_route_change(db: Session, route: models.Route, deleted: bool = False):
+    if route.route_id is None:
+        db.flush()
+    db.add(models.VisitChange(
+        entity="route",
+        entity_id=str(route.route_id),
+        operation=DELETE if deleted else UPSERT,
+        date=route.date,
+        staff_id=_str_or_none(route.staff_id),
+    ))
+
+
+def record_visit_inserts(db: Session, rows: Iterable[dict]):
+    """バルクINSERTした訪問（visit_id を含む辞書）をまとめて記録（書き込みは commit 直前）"""
+    db.info.setdefault(PENDING_KEY, []).extend(
+        {
+            "entity": "visit",
+            "entity_id": str(row["visit_id"]),
+            "operation": UPSERT,
+            "date": row["date"],
+            "staff_id": _str_or_none(row.get("staff_id")),
+        }
+        for row in rows
+    )
+
+
+@event.listens_for(Session, "before_commit")
+def _write_pending_changes(db: Session):
+    changes = db.info.pop(PENDING_KEY, None)
+    if changes:
+        db.execute(insert(models.VisitChange), changes)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending_changes(db: Session, transaction: SessionTransaction):
+    # ロールバック・close時は記録しない（入れ子のトランザクションの終了では破棄しない）
+    if transaction.parent is None:
+        db.info.pop(PENDING_KEY, None)
+
+
+def latest_change_id(db: Session) -> int:
+    return db.query(func.max(models.VisitChange.change_id)).scalar() or 0
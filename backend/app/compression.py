@@ -0,0 +1,158 @@
+"""
+レスポンス圧縮（gzip / brotli）
+
+- Accept-Encoding の q 値で方式を選ぶ（同順位なら brotli を優先）。brotli は brotli パッケージがある場合のみ
+- 圧縮するのは JSON・NDJSON・CSV などのテキスト形式のみ。
+  xlsx / zip / Parquet は形式自体が圧縮済みのため対象外、SSE（text/event-stream）は配信が遅れるため対象外
+- 本文が settings.compression_minimum_size 未満なら圧縮しない（ヘッダーと CPU のコストの方が大きい）
+- ストリーミング応答（NDJSON・CSV出力）はチャンクごとに flush しながら圧縮する
+- Content-Encoding 付きの応答（レスポンスキャッシュの圧縮済み本文）はそのまま通す
+- 圧縮した応答の ETag は弱いETag（W/）にする（If-None-Match 側は W/ を除いて比較する）
+"""
+import zlib
+from functools import lru_cache
+from typing import Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+
+# text/* 以外で圧縮する形式
+COMPRESSIBLE_TYPES = {"application/json", "application/x-ndjson", "application/javascript", "image/svg+xml"}
+# text/* のうち圧縮しない形式
+EXCLUDED_TYPES = {"text/event-stream"}
+
+
+@lru_cache(maxsize=1)
+def available_encodings() -> Tuple[str, ...]:
+    """優先順の対応方式"""
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return ("gzip",)
+    return ("br", "gzip")
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Accept-Encoding から使う方式を選ぶ（圧縮できない場合は None）"""
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    mime = content_type.split(";", 1)[0].strip().lower()
+    if mime in EXCLUDED_TYPES:
+        return False
+    return mime in COMPRESSIBLE_TYPES or mime.startswith("text/")
+
+
+class Compressor:
+    """ストリーム圧縮（compress はチャンクごとに flush し、受信側がすぐ展開できるようにする）"""
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        if encoding == "br":
+            import brotli
+
+            quality = settings.compression_brotli_quality if level is None else level
+            self._brotli = brotli.Compressor(quality=quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits=31: gzip形式（ヘッダーの mtime は 0 固定のため同じ本文なら同じ出力）
+            self._zlib = zlib.compressobj(settings.compression_gzip_level if level is None else level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    return Compressor(encoding, level).finish(body)
+
+
+class CompressionMiddleware:
+    """Accept-Encoding に応じて gzip / brotli で圧縮するASGIミドルウェア"""
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.compression_minimum_size if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message  # 最初の本文を見てから圧縮するか決める
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if (
+                    "content-encoding" in headers
+                    or start["status"] in (204, 206, 304)
+                    or not is_compressible(headers.get("content-type", ""))
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                compressor = Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compressor.finish(body)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+
+            body = compressor.compress(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,58 @@
+"""
+条件付きGET（ETag / If-None-Match → 304）のヘルパー
+
+ETag はエンドポイント・閲覧範囲（ロール・スタッフ）・クエリ・データバージョンから作るため、
+データが変わらない限り同じ値になる。一致した場合は行を読み込む前に 304 を返す。
+"""
+import hashlib
+from typing import Awaitable, Callable, Optional
+from fastapi import Request, Response
+from app import models
+from app.auth import Principal
+from app.compression import negotiate
+from app.response_cache import response_cache
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def user_scope(current_user: Principal) -> str:
+    """閲覧範囲（staffロールは本人の訪問のみ）"""
+    if current_user.role == models.RoleEnum.staff:
+        return f"staff:{current_user.staff_id}"
+    return str(current_user.role)
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+async def cached_response(request: Request, tag: str, etag: str, build: Callable[[], Awaitable[bytes]]) -> Response:
+    """
+    ETag をキーにレスポンスキャッシュした JSON 本文を返す
+    クライアントが gzip / brotli に対応していれば、キャッシュ済みの圧縮本文をそのまま返す
+    """
+    encoding = negotiate(request.headers.get("accept-encoding", ""))
+    body, encoding = await response_cache.get_or_build_encoded_async(tag, etag, encoding, build)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        headers["ETag"] = f"W/{etag}"
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -4,10 +4,52 @@ from typing import Optional
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./ikaruRoute.db"
+    # プライマリ（書き込み・画面操作）の接続プール。statement_timeout はPostgreSQLのみ（ミリ秒）
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_pre_ping: bool = False
+    db_statement_timeout_ms: Optional[int] = None
+    # 読み取り専用（GET・レポート・分析出力）。未指定時はプライマリに別プールで接続
+    read_database_url: Optional[str] = None
+    read_db_pool_size: int = 5
+    read_db_max_overflow: int = 10
+    read_db_pool_timeout: int = 30
+    read_db_pool_pre_ping: bool = True
+    read_db_statement_timeout_ms: Optional[int] = 120000
+    # 起動時に create_all でテーブルを作成（ローカル開発用。通常は python manage.py migrate）
+    auto_create_schema: bool = False
+    # 非同期エンドポイント用のURL（未指定時は読み取り用URLのドライバを asyncpg / aiosqlite に置き換え）
+    async_database_url: Optional[str] = None
     secret_key: str = "ikaruRoute_dev_secret_key_2026"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 480
+    # 認証済みユーザーのキャッシュ（スタッフ更新は同一ワーカーなら即時、他ワーカーはTTL秒以内に反映）
+    principal_cache_ttl: int = 60
+    principal_cache_max_entries: int = 10000
+    # パスワードハッシュ方式（カンマ区切り、先頭が現行。それ以外はログイン時に再ハッシュ）
+    password_schemes: str = "sha256_crypt"
+    # パスワードハッシュ計算のプロセス数と待機数の上限（超過時は503）
+    password_hash_workers: int = 2
+    password_hash_queue_size: int = 64
     cors_origins: str = "http://localhost:3000"
+    # 進捗プッシュ配信（memory:// または redis://...）
+    broadcast_url: str = "memory://"
+    # 介護報酬の地域区分（app/billing.py の AREA_UNIT_PRICES のキー）
+    billing_area_grade: str = "その他"
+    # 生成済みExcelのディスクキャッシュ（未指定時はOSの一時ディレクトリ配下）
+    report_cache_dir: Optional[str] = None
+    report_cache_max_bytes: int = 200 * 1024 * 1024
+    # 期間Excel出力のプロセス数
+    report_export_workers: int = 2
+    # 日次ビューのレスポンスキャッシュ（memory:// または redis://...）
+    response_cache_url: str = "memory://"
+    response_cache_max_entries: int = 1024
+    response_cache_ttl: int = 300
+    # レスポンス圧縮（gzip / brotli）。この大きさ（バイト）未満の本文は圧縮しない
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
 
     class Config:
         env_file = ".env"
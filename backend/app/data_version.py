@@ -0,0 +1,76 @@
+"""
+日付単位のデータバージョン
+
+訪問・ルート・売上を書き換える処理は、同じトランザクション内で該当日の
+bump_data_version() を呼ぶ。スタッフ・利用者の変更は全日付の表示に影響するため
+bump_master_version() を呼ぶ。
+get_data_version() の値が変わらない限り、その日の生成済みレポート等は再利用できる。
+バージョンを進める際はレスポンスキャッシュの該当エントリも破棄する。
+"""
+import hashlib
+from datetime import date
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app import models
+from app.database import increment_counters
+from app.response_cache import response_cache
+
+MASTER_KEY = "master"
+
+
+def _date_key(target_date: date) -> str:
+    return target_date.isoformat()
+
+
+def bump_data_version(db: Session, *dates: date):
+    """指定日のバージョンを進める（commitは呼び出し元）"""
+    for target_date in sorted(set(dates)):
+        increment_counters(db, models.DataVersion, {"key": _date_key(target_date)}, {"version": 1})
+        response_cache.invalidate(_date_key(target_date))
+
+
+def bump_master_version(db: Session):
+    """スタッフ・利用者の変更（全日付に影響）"""
+    increment_counters(db, models.DataVersion, {"key": MASTER_KEY}, {"version": 1})
+    response_cache.clear()
+
+
+def get_data_version(db: Session, target_date: date) -> str:
+    """指定日のデータバージョン（"日付側.マスタ側"）"""
+    versions = dict(db.query(models.DataVersion.key, models.DataVersion.version).filter(
+        models.DataVersion.key.in_([_date_key(target_date), MASTER_KEY])
+    ).all())
+    return f"{versions.get(_date_key(target_date), 0)}.{versions.get(MASTER_KEY, 0)}"
+
+
+def get_date_version(db: Session, target_date: date) -> int:
+    """
+    指定日側のバージョン番号
+    bump_data_version() の後・commit前に読むと、そのトランザクションで進めた値になる（行はUPSERTでロック済み）
+    """
+    return db.query(models.DataVersion.version).filter(
+        models.DataVersion.key == _date_key(target_date)
+    ).scalar() or 0
+
+
+def date_version_column(target_date: date):
+    """指定日側のバージョン番号（集計と同じ文で読むためのスカラーサブクエリ）"""
+    return func.coalesce(
+        select(models.DataVersion.version).where(
+            models.DataVersion.key == _date_key(target_date)
+        ).scalar_subquery(),
+        0,
+    )
+
+
+def get_range_version(db: Session, start_date: date, end_date: date) -> str:
+    """期間（両端含む）のデータバージョン。単日なら get_data_version() と同じ値"""
+    if start_date == end_date:
+        return get_data_version(db, start_date)
+    rows = db.query(models.DataVersion.key, models.DataVersion.version).filter(
+        (models.DataVersion.key == MASTER_KEY) | models.DataVersion.key.between(
+            _date_key(start_date), _date_key(end_date)
+        )
+    ).order_by(models.DataVersion.key).all()
+    digest = hashlib.sha1(";".join(f"{key}={version}" for key, version in rows).encode()).hexdigest()
+    return digest[:16]
@@ -1,14 +1,69 @@
+import threading
+from datetime import datetime
+from typing import Optional
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
-# SQLite用の設定（PostgreSQL使用時はconnect_argsは無視される）
-connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
-engine = create_engine(settings.database_url, connect_args=connect_args)
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":"))
+
+
+def engine_options(url: str, pool_size: int, max_overflow: int, pool_timeout: int,
+                   pool_pre_ping: bool, statement_timeout_ms: Optional[int], is_async: bool = False) -> dict:
+    """
+    エンジンごとの接続プール・タイムアウト設定
+    statement_timeout は PostgreSQL のみ（psycopg2 / asyncpg で渡し方が異なる）
+    """
+    options = {"pool_pre_ping": pool_pre_ping}
+    if url.startswith("sqlite"):
+        if not is_async:
+            options["connect_args"] = {"check_same_thread": False}
+        if _is_memory_sqlite(url):
+            return options
+        if is_async:
+            # aiosqlite の既定（NullPool）は接続ごとにスレッドを作るため、ファイルDBでは接続を使い回す
+            from sqlalchemy.pool import AsyncAdaptedQueuePool
+            options["poolclass"] = AsyncAdaptedQueuePool
+    elif statement_timeout_ms and url.startswith("postgres"):
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(statement_timeout_ms)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout_ms}"}
+    options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout)
+    return options
+
+
+def _primary_options(url: str, is_async: bool = False) -> dict:
+    return engine_options(
+        url, settings.db_pool_size, settings.db_max_overflow, settings.db_pool_timeout,
+        settings.db_pool_pre_ping, settings.db_statement_timeout_ms, is_async
+    )
+
+
+def _read_options(url: str, is_async: bool = False) -> dict:
+    return engine_options(
+        url, settings.read_db_pool_size, settings.read_db_max_overflow, settings.read_db_pool_timeout,
+        settings.read_db_pool_pre_ping, settings.read_db_statement_timeout_ms, is_async
+    )
+
+
+# 書き込み・書き込み直後の読み直し（プライマリ）
+engine = create_engine(settings.database_url, **_primary_options(settings.database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# 読み取り専用（GET・レポート・分析出力）。read_database_url（レプリカ）未指定時はプライマリに別プールで接続し、
+# 月末の重い集計が配車画面の接続を使い切らないようにする
+READ_DATABASE_URL = settings.read_database_url or settings.database_url
+if _is_memory_sqlite(READ_DATABASE_URL):
+    read_engine = engine  # インメモリDBは接続ごとに別DBになるため共有する
+else:
+    read_engine = create_engine(READ_DATABASE_URL, **_read_options(READ_DATABASE_URL))
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 
 def get_db():
     db = SessionLocal()
@@ -16,3 +71,81 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """GET・レポート用（レプリカの場合は直前の書き込みが反映されていないことがある）"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ===== 非同期エンジン（読み取り系の async エンドポイント用） =====
+# 読み取り専用エンジンと同じ接続先・プール設定。書き込みは当面 get_db（同期）のまま。
+# ドライバ（asyncpg / aiosqlite）は初回利用時に読み込む
+_async_session_factory = None
+_async_lock = threading.Lock()
+
+
+def async_database_url(url: str) -> str:
+    """同期用URLから非同期ドライバのURLを作る（settings.async_database_url 指定時はそちらを優先）"""
+    if settings.async_database_url:
+        return settings.async_database_url
+    scheme, sep, rest = url.partition("://")
+    if scheme in ("postgresql", "postgres", "postgresql+psycopg2"):
+        return f"postgresql+asyncpg://{rest}"
+    if scheme == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+
+def get_async_session_factory():
+    global _async_session_factory
+    with _async_lock:
+        if _async_session_factory is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            url = async_database_url(READ_DATABASE_URL)
+            async_engine = create_async_engine(url, **_read_options(url, is_async=True))
+            _async_session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        return _async_session_factory
+
+
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
+
+
+def increment_counters(db, model, keys: dict, deltas: dict):
+    """
+    キー行が無ければ作成し、あれば数値列に加算（集計表・バージョン番号用）
+    同時更新でも取りこぼさないよう、加算はDB側の UPSERT で行う
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        row = db.query(model).filter_by(**keys).with_for_update().first()
+        if row is None:
+            row = model(**keys, **{column: 0 for column in deltas})
+            db.add(row)
+        for column, delta in deltas.items():
+            setattr(row, column, getattr(row, column) + delta)
+        db.flush()
+        return
+
+    table = model.__table__
+    now = datetime.utcnow()
+    stmt = insert(table).values(**keys, **deltas, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={
+            **{column: table.c[column] + stmt.excluded[column] for column in deltas},
+            "updated_at": now,
+        },
+    )
+    db.execute(stmt)
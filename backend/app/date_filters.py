@@ -0,0 +1,43 @@
+"""
+日付・月の絞り込み条件ヘルパー
+
+列に関数（to_char 等）をかけるとインデックスが使えず、DB方言にも依存するため、
+月や期間の指定はすべて半開区間 `start <= 列 < end` の比較に変換する。
+PostgreSQL / SQLite のどちらでも同じSQLになり、date列のインデックスが効く。
+"""
+from datetime import date
+from typing import Tuple
+from fastapi import HTTPException
+from sqlalchemy import and_
+
+
+def parse_month(target_month: str) -> date:
+    """'YYYY-MM' を月初日に変換"""
+    try:
+        year, month = target_month.split("-")
+        return date(int(year), int(month), 1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="対象月はYYYY-MM形式で指定してください")
+
+
+def next_month(first_day: date) -> date:
+    if first_day.month == 12:
+        return date(first_day.year + 1, 1, 1)
+    return date(first_day.year, first_day.month + 1, 1)
+
+
+def month_range(target_month: str) -> Tuple[date, date]:
+    """'YYYY-MM' → (月初日, 翌月初日)"""
+    first_day = parse_month(target_month)
+    return first_day, next_month(first_day)
+
+
+def date_range_filter(column, start: date, end: date):
+    """半開区間 start <= column < end"""
+    return and_(column >= start, column < end)
+
+
+def month_filter(column, target_month: str):
+    """指定月（YYYY-MM）に含まれる行"""
+    return date_range_filter(column, *month_range(target_month))
+
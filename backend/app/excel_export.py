@@ -1,9 +1,13 @@
-import io
-from datetime import date, datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+import queue
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased
 from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side, GradientFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, Alignment, NamedStyle
 from openpyxl.utils import get_column_letter
 from app import models
 
@@ -19,12 +23,213 @@ SERVICE_COLORS = {
 TWO_STAFF_COLOR = "FFF2CC"  # 黄色（2人体制）
 HEADER_COLOR = "2F4F8F"     # ダークブルー（ヘッダー）
 
+# 時間軸設定（5:00〜翌5:00、15分刻み）
+START_HOUR = 5
+TIME_SLOTS = [
+    f"{(START_HOUR + h) % 24:02d}:{m:02d}"
+    for h in range(24)
+    for m in [0, 15, 30, 45]
+]
+
+# ストリーミング送信のチャンクサイズ
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _solid(color: str) -> PatternFill:
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+# 名前付きスタイル（セルごとにFill/Font/Alignmentを生成せず、ブック単位で共有する）
+STYLE_SPECS = {
+    "ir_header": dict(fill=_solid(HEADER_COLOR), font=Font(color="FFFFFF", bold=True), alignment=Alignment(horizontal="center")),
+    "ir_time": dict(alignment=Alignment(horizontal="center")),
+    "ir_time_hour": dict(fill=_solid("F2F2F2"), font=Font(bold=True), alignment=Alignment(horizontal="center")),
+    "ir_summary": dict(fill=_solid("E8F4FD"), font=Font(bold=True)),
+    "ir_bold": dict(font=Font(bold=True)),
+    "ir_two_staff": dict(fill=_solid(TWO_STAFF_COLOR), alignment=Alignment(wrap_text=True, vertical="top")),
+    "ir_visit_default": dict(fill=_solid("FFFFFF"), alignment=Alignment(wrap_text=True, vertical="top")),
+    **{
+        f"ir_visit_{service_type}": dict(fill=_solid(color), alignment=Alignment(wrap_text=True, vertical="top"))
+        for service_type, color in SERVICE_COLORS.items()
+    },
+}
+
+
+@dataclass
+class VisitCell:
+    """ルート表の1セル分の訪問"""
+    scheduled_start: datetime
+    scheduled_end: datetime
+    service_type: str
+    visit_type: str
+    client_name: Optional[str]
+    companion_name: Optional[str]
+
+
+@dataclass
+class StaffReportRow:
+    """スタッフ1名分（ルート表の1列・売上集計/進捗率シートの1行）"""
+    staff_id: str
+    name: str
+    visits: List[VisitCell] = field(default_factory=list)
+    status_counts: Dict[str, int] = field(default_factory=dict)
+    revenue_amount: int = 0
+    revenue_count: int = 0
+    revenue_minutes: int = 0
+
+
+@dataclass
+class RouteReportData:
+    """ルート表Excelの全シートが共有するデータ（生成前にまとめて取得する）"""
+    target_date: date
+    include_revenue: bool
+    staff: List[StaffReportRow]
+
+
+def generate_route_excel(db: Session, target_date: date, include_revenue: bool = False) -> Iterator[bytes]:
+    """
+    現行フォーマット準拠の日次ルート表Excelを生成
+    DB取得はこの呼び出し時に済ませ、戻り値のイテレータはブックを書き出しながらバイト列を返す
+    """
+    data = load_route_report_data(db, target_date, include_revenue)
+    return stream_workbook(lambda fileobj: write_route_workbook(data, fileobj))
+
+
+def load_route_report_data(db: Session, target_date: date, include_revenue: bool) -> RouteReportData:
+    """
+    全シート分のデータを固定回数（3〜4回）のクエリで取得
+    スタッフ数・訪問数によらずクエリ数は一定
+    """
+    staff_rows = [
+        StaffReportRow(staff_id=str(staff_id), name=name)
+        for staff_id, name in db.query(models.Staff.staff_id, models.Staff.name).filter(
+            models.Staff.is_active == True
+        ).order_by(models.Staff.name)
+    ]
+    by_id = {row.staff_id: row for row in staff_rows}
+
+    # 訪問（利用者名・同行スタッフ名を結合）
+    companion = aliased(models.Staff)
+    visits = db.query(
+        models.Visit.staff_id,
+        models.Visit.scheduled_start,
+        models.Visit.scheduled_end,
+        models.Visit.service_type,
+        models.Visit.visit_type,
+        models.Visit.companion_staff_id,
+        models.Client.name,
+        companion.name
+    ).outerjoin(
+        models.Client, models.Client.client_id == models.Visit.client_id
+    ).outerjoin(
+        companion, companion.staff_id == models.Visit.companion_staff_id
+    ).filter(
+        models.Visit.date == target_date,
+        models.Visit.staff_id != None
+    )
+    for staff_id, start, end, service_type, visit_type, companion_id, client_name, companion_name in visits:
+        row = by_id.get(str(staff_id))
+        if row:
+            row.visits.append(VisitCell(
+                scheduled_start=start,
+                scheduled_end=end,
+                service_type=service_type,
+                visit_type=visit_type,
+                client_name=client_name,
+                companion_name=companion_name if companion_id else None,
+            ))
+
+    # ステータス別件数
+    status_counts = db.query(
+        models.Visit.staff_id,
+        models.Visit.status,
+        func.count(models.Visit.visit_id)
+    ).filter(
+        models.Visit.date == target_date,
+        models.Visit.staff_id != None
+    ).group_by(models.Visit.staff_id, models.Visit.status)
+    for staff_id, status, count in status_counts:
+        row = by_id.get(str(staff_id))
+        if row:
+            row.status_counts[status] = count
+
+    # 売上（日次ロールアップ）
+    if include_revenue:
+        rollups = db.query(
+            models.StaffRevenueDaily.staff_id,
+            models.StaffRevenueDaily.amount,
+            models.StaffRevenueDaily.visit_count,
+            models.StaffRevenueDaily.duration_minutes
+        ).filter(models.StaffRevenueDaily.date == target_date)
+        for staff_id, amount, visit_count, minutes in rollups:
+            row = by_id.get(str(staff_id))
+            if row:
+                row.revenue_amount, row.revenue_count, row.revenue_minutes = amount, visit_count, minutes
+
+    return RouteReportData(target_date=target_date, include_revenue=include_revenue, staff=staff_rows)
+
+
+def _new_workbook() -> Workbook:
+    """名前付きスタイルを登録した書き込み専用ブック"""
+    wb = Workbook(write_only=True)
+    for name, spec in STYLE_SPECS.items():
+        wb.add_named_style(NamedStyle(name=name, **spec))
+    return wb
+
+
+def _route_sheet_title(target_date: date) -> str:
+    return f"ルート表_{target_date.strftime('%m月%d日')}"
+
+
+def write_route_workbook(data: RouteReportData, fileobj):
+    """書き込み専用モードでブックを生成してfileobjへ保存"""
+    wb = _new_workbook()
+
+    ws = wb.create_sheet(title=_route_sheet_title(data.target_date))
+    _write_route_sheet(ws, data)
+
+    # 売上集計シート（権限付き）
+    if data.include_revenue:
+        ws_rev = wb.create_sheet(title="売上集計")
+        _generate_revenue_sheet(ws_rev, data)
+
+    # 進捗率シート
+    ws_prog = wb.create_sheet(title="進捗率")
+    _generate_progress_sheet(ws_prog, data)
+
+    wb.save(fileobj)
+
+
+def write_range_workbook(days: List[RouteReportData], fileobj):
+    """複数日のルート表を1日1シートで1つのブックに保存（月次提出用。売上権限があれば期間の売上集計シートを追加）"""
+    wb = _new_workbook()
+    for data in days:
+        _write_route_sheet(wb.create_sheet(title=_route_sheet_title(data.target_date)), data)
+
+    if days and days[0].include_revenue:
+        totals: Dict[str, StaffReportRow] = {}
+        for data in days:
+            for staff in data.staff:
+                total = totals.setdefault(staff.staff_id, StaffReportRow(staff_id=staff.staff_id, name=staff.name))
+                total.revenue_amount += staff.revenue_amount
+                total.revenue_count += staff.revenue_count
+                total.revenue_minutes += staff.revenue_minutes
+        period = RouteReportData(target_date=days[0].target_date, include_revenue=True, staff=list(totals.values()))
+        _generate_revenue_sheet(wb.create_sheet(title="売上集計"), period)
+
+    wb.save(fileobj)
 
-def generate_route_excel(db: Session, target_date: date, include_revenue: bool = False) -> io.BytesIO:
-    """現行フォーマット準拠の日次ルート表Excelを生成"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"ルート表_{target_date.strftime('%m月%d日')}"
+
+def _styled(ws, value, style: str) -> WriteOnlyCell:
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def _write_route_sheet(ws, data: RouteReportData):
+    """メインのルート表シート（行単位で書き出す）"""
+    target_date = data.target_date
+    staff_list = data.staff
 
     # 印刷設定（A3横向き）
     ws.page_setup.paperSize = 8  # A3
@@ -32,163 +237,160 @@ def generate_route_excel(db: Session, target_date: date, include_revenue: bool =
     ws.oddHeader.center.text = f"鶴進HMG 訪問介護ルート表　{target_date.strftime('%Y年%m月%d日')}"
     ws.oddFooter.right.text = "ページ &P / &N"
 
-    # スタッフ一覧取得
-    staff_list = db.query(models.Staff).filter(models.Staff.is_active == True).order_by(models.Staff.name).all()
-
-    # 時間軸設定（5:00〜翌5:00、15分刻み）
-    start_hour = 5
-    time_slots = []
-    for h in range(24):
-        for m in [0, 15, 30, 45]:
-            actual_hour = (start_hour + h) % 24
-            time_slots.append(f"{actual_hour:02d}:{m:02d}")
-
-    # ヘッダー行
-    ws.cell(row=1, column=1, value="時刻")
-    ws.cell(row=1, column=1).fill = PatternFill(start_color=HEADER_COLOR, end_color=HEADER_COLOR, fill_type="solid")
-    ws.cell(row=1, column=1).font = Font(color="FFFFFF", bold=True)
+    # 列幅・オートフィルタは行の書き出し前に設定する
     ws.column_dimensions["A"].width = 8
-
-    for col_idx, staff in enumerate(staff_list, start=2):
-        cell = ws.cell(row=1, column=col_idx, value=staff.name)
-        cell.fill = PatternFill(start_color=HEADER_COLOR, end_color=HEADER_COLOR, fill_type="solid")
-        cell.font = Font(color="FFFFFF", bold=True)
-        cell.alignment = Alignment(horizontal="center")
+    for col_idx in range(2, len(staff_list) + 2):
         ws.column_dimensions[get_column_letter(col_idx)].width = 18
+    ws.auto_filter.ref = f"A1:{get_column_letter(len(staff_list) + 1)}1"
 
-    # 時間軸列
-    for row_idx, time_str in enumerate(time_slots, start=2):
-        cell = ws.cell(row=row_idx, column=1, value=time_str)
-        cell.alignment = Alignment(horizontal="center")
-        if time_str.endswith(":00"):
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-
-    # 訪問データを取得してセルに書き込み
-    visits = db.query(models.Visit).filter(
-        models.Visit.date == target_date
-    ).all()
-
-    # スタッフ別訪問マップ
-    staff_visits = {str(s.staff_id): [] for s in staff_list}
-    for visit in visits:
-        if visit.staff_id and str(visit.staff_id) in staff_visits:
-            staff_visits[str(visit.staff_id)].append(visit)
-
+    # 時間枠（行）× スタッフ（列）の配置を先に決める
+    grid: Dict[int, Dict[int, WriteOnlyCell]] = {}
+    summaries = []
     for col_idx, staff in enumerate(staff_list, start=2):
-        staff_visit_list = staff_visits.get(str(staff.staff_id), [])
         total_minutes = 0
         visit_count = 0
 
-        for visit in staff_visit_list:
+        for visit in staff.visits:
             # 開始時刻の行を特定
             visit_start = visit.scheduled_start
-            start_slot_hour = (visit_start.hour - start_hour) % 24
+            start_slot_hour = (visit_start.hour - START_HOUR) % 24
             start_slot_min = visit_start.minute // 15
-            row_idx = 2 + start_slot_hour * 4 + start_slot_min
+            slot_idx = start_slot_hour * 4 + start_slot_min
 
             # セル内容
             duration = int((visit.scheduled_end - visit.scheduled_start).total_seconds() / 60)
-            client_name = visit.client.name if visit.client else "不明"
-            service_type = visit.service_type if isinstance(visit.service_type, str) else visit.service_type.value
+            client_name = visit.client_name or "不明"
+            service_type = visit.service_type
             content = f"{client_name} {service_type}{duration}"
 
-            if visit.companion_staff_id and visit.visit_type == "two_staff":
-                companion = db.query(models.Staff).filter(
-                    models.Staff.staff_id == visit.companion_staff_id
-                ).first()
-                if companion:
-                    content += f"（{companion.name}と）"
-
-            cell = ws.cell(row=row_idx, column=col_idx, value=content)
+            if visit.visit_type == "two_staff" and visit.companion_name:
+                content += f"（{visit.companion_name}と）"
 
             # セル色分け
-            color = SERVICE_COLORS.get(service_type, "FFFFFF")
             if visit.visit_type == "two_staff":
-                color = TWO_STAFF_COLOR
-            cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-            cell.alignment = Alignment(wrap_text=True, vertical="top")
+                style = "ir_two_staff"
+            elif service_type in SERVICE_COLORS:
+                style = f"ir_visit_{service_type}"
+            else:
+                style = "ir_visit_default"
+            grid.setdefault(slot_idx, {})[col_idx] = _styled(ws, content, style)
 
             total_minutes += duration
             visit_count += 1
 
-        # 集計行（最終行）
-        summary_row = 2 + len(time_slots)
-        ws.cell(row=summary_row, column=1, value="集計")
-        summary_cell = ws.cell(
-            row=summary_row,
-            column=col_idx,
-            value=f"{total_minutes // 60}時間{total_minutes % 60}分 / {visit_count}件"
-        )
-        summary_cell.font = Font(bold=True)
-        summary_cell.fill = PatternFill(start_color="E8F4FD", end_color="E8F4FD", fill_type="solid")
+        summaries.append(f"{total_minutes // 60}時間{total_minutes % 60}分 / {visit_count}件")
 
-    # 売上集計シート（権限付き）
-    if include_revenue:
-        ws_rev = wb.create_sheet(title="売上集計")
-        _generate_revenue_sheet(ws_rev, db, target_date, staff_list)
-
-    # 進捗率シート
-    ws_prog = wb.create_sheet(title="進捗率")
-    _generate_progress_sheet(ws_prog, db, target_date, staff_list)
+    # ヘッダー行
+    ws.append(
+        [_styled(ws, "時刻", "ir_header")]
+        + [_styled(ws, staff.name, "ir_header") for staff in staff_list]
+    )
 
-    # オートフィルタ設定
-    ws.auto_filter.ref = f"A1:{get_column_letter(len(staff_list) + 1)}1"
+    # 時間軸列＋訪問セル
+    for slot_idx, time_str in enumerate(TIME_SLOTS):
+        row = [_styled(ws, time_str, "ir_time_hour" if time_str.endswith(":00") else "ir_time")]
+        cells = grid.get(slot_idx)
+        if cells:
+            row += [cells.get(col_idx) for col_idx in range(2, len(staff_list) + 2)]
+        ws.append(row)
 
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    return buffer
+    # 集計行（最終行）
+    if summaries:
+        ws.append(["集計"] + [_styled(ws, summary, "ir_summary") for summary in summaries])
 
 
-def _generate_revenue_sheet(ws, db: Session, target_date: date, staff_list):
+def _generate_revenue_sheet(ws, data: RouteReportData):
     """売上集計シート生成"""
-    ws.cell(row=1, column=1, value="スタッフ名").font = Font(bold=True)
-    ws.cell(row=1, column=2, value="訪問件数").font = Font(bold=True)
-    ws.cell(row=1, column=3, value="売上合計（円）").font = Font(bold=True)
-    ws.cell(row=1, column=4, value="稼働時間").font = Font(bold=True)
-
-    for row_idx, staff in enumerate(staff_list, start=2):
-        revenues = db.query(models.Revenue).filter(
-            and_(
-                models.Revenue.staff_id == staff.staff_id,
-                models.Revenue.date == target_date
-            )
-        ).all()
-        total_revenue = sum(r.amount for r in revenues)
-        total_minutes = sum(r.duration_minutes for r in revenues)
-
-        ws.cell(row=row_idx, column=1, value=staff.name)
-        ws.cell(row=row_idx, column=2, value=len(revenues))
-        ws.cell(row=row_idx, column=3, value=total_revenue)
-        ws.cell(row=row_idx, column=4, value=f"{total_minutes // 60}時間{total_minutes % 60}分")
-
-
-def _generate_progress_sheet(ws, db: Session, target_date: date, staff_list):
+    ws.append([_styled(ws, title, "ir_bold") for title in ["スタッフ名", "訪問件数", "売上合計（円）", "稼働時間"]])
+
+    for staff in data.staff:
+        total_minutes = staff.revenue_minutes
+        ws.append([staff.name, staff.revenue_count, staff.revenue_amount, f"{total_minutes // 60}時間{total_minutes % 60}分"])
+
+
+def _generate_progress_sheet(ws, data: RouteReportData):
     """進捗率シート生成"""
-    ws.cell(row=1, column=1, value="スタッフ名").font = Font(bold=True)
-    ws.cell(row=1, column=2, value="担当件数").font = Font(bold=True)
-    ws.cell(row=1, column=3, value="完了件数").font = Font(bold=True)
-    ws.cell(row=1, column=4, value="中止件数").font = Font(bold=True)
-    ws.cell(row=1, column=5, value="未実施件数").font = Font(bold=True)
-    ws.cell(row=1, column=6, value="完了率").font = Font(bold=True)
-
-    for row_idx, staff in enumerate(staff_list, start=2):
-        visits = db.query(models.Visit).filter(
-            and_(
-                models.Visit.staff_id == staff.staff_id,
-                models.Visit.date == target_date
-            )
-        ).all()
-        total = len(visits)
-        completed = sum(1 for v in visits if v.status == models.VisitStatusEnum.completed)
-        cancelled = sum(1 for v in visits if v.status == models.VisitStatusEnum.cancelled)
-        not_done = sum(1 for v in visits if v.status == models.VisitStatusEnum.not_done)
+    ws.append([
+        _styled(ws, title, "ir_bold")
+        for title in ["スタッフ名", "担当件数", "完了件数", "中止件数", "未実施件数", "完了率"]
+    ])
+
+    for staff in data.staff:
+        counts = staff.status_counts
+        total = sum(counts.values())
+        completed = counts.get(models.VisitStatusEnum.completed.value, 0)
+        cancelled = counts.get(models.VisitStatusEnum.cancelled.value, 0)
+        not_done = counts.get(models.VisitStatusEnum.not_done.value, 0)
         rate = round(completed / total * 100, 1) if total > 0 else 0
 
-        ws.cell(row=row_idx, column=1, value=staff.name)
-        ws.cell(row=row_idx, column=2, value=total)
-        ws.cell(row=row_idx, column=3, value=completed)
-        ws.cell(row=row_idx, column=4, value=cancelled)
-        ws.cell(row=row_idx, column=5, value=not_done)
-        ws.cell(row=row_idx, column=6, value=f"{rate}%")
+        ws.append([staff.name, total, completed, cancelled, not_done, f"{rate}%"])
+
+
+class _ChunkWriter:
+    """書き込まれたバイト列をチャンク単位でキューへ渡すファイル風オブジェクト（シーク不可）"""
+
+    def __init__(self, put: Callable[[bytes], None], chunk_size: int):
+        self._put = put
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+
+    def write(self, b) -> int:
+        self._buffer += b
+        if len(self._buffer) >= self._chunk_size:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self._buffer:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+
+
+def stream_workbook(write: Callable[[object], None], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    write(fileobj) を別スレッドで実行し、書き出されたバイト列を順次返す
+    xlsx（zip）はシーク不可の出力にも書けるため、ブック全体をメモリに持たずに送信できる
+    """
+    chunks: queue.Queue = queue.Queue(maxsize=8)
+    cancelled = threading.Event()
+    done = object()
+
+    def put(item):
+        # 受信側が切断した場合は書き出しを打ち切る
+        while not cancelled.is_set():
+            try:
+                chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+        raise RuntimeError("Excel stream cancelled")
+
+    def run():
+        try:
+            writer = _ChunkWriter(put, chunk_size)
+            write(writer)
+            writer.close()
+            put(done)
+        except Exception as e:
+            if not cancelled.is_set():
+                put(e)
+
+    def iterate():
+        thread = threading.Thread(target=run, name="excel-export", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+
+    return iterate()
@@ -0,0 +1,244 @@
+"""
+過去のルート表Excel（excel_export.py と同じレイアウト）の一括取込
+
+- ブックは openpyxl の読み取り専用モードで行単位に読み込む
+- シート名「ルート表_MM月DD日」を日付、1行目をスタッフ名、A列を15分刻みの時刻として扱う
+  5:00始まりのため 0:00〜4:45 の行は翌日の訪問
+- セル「利用者名 サービス種別+分数（同行者名と）」を訪問に変換する
+- 利用者・スタッフは名前 → ID の辞書で解決し、訪問はチャンク単位のバルクINSERTで登録する
+- 解決できないセル・登録済みの訪問（同一利用者・同一開始時刻）は取り込まずに conflicts として返す
+"""
+import os
+import re
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from openpyxl.utils import get_column_letter
+from app import models
+from app.date_filters import date_range_filter
+from app.data_version import bump_data_version
+from app.change_log import record_visit_inserts
+from app.excel_export import START_HOUR
+
+CHUNK_SIZE = 2000
+
+SHEET_TITLE_PATTERN = re.compile(r"^ルート表_(\d{1,2})月(\d{1,2})日$")
+FILENAME_DATE_PATTERN = re.compile(r"(\d{4})(\d{2})(\d{2})")
+CELL_PATTERN = re.compile(
+    r"^(?P<client>.+) (?P<service>身体|家事|生活|重度|障がい)(?P<duration>\d+)(?:（(?P<companion>.+)と）)?$"
+)
+
+# 同名が複数いる場合の目印
+_AMBIGUOUS = object()
+
+
+@dataclass
+class ImportResult:
+    sheets: int = 0
+    cells: int = 0
+    imported: int = 0
+    dates: List[date] = field(default_factory=list)
+    conflicts: List[dict] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "sheets": self.sheets,
+            "cells": self.cells,
+            "imported": self.imported,
+            "skipped": len(self.conflicts),
+            "start_date": min(self.dates) if self.dates else None,
+            "end_date": max(self.dates) if self.dates else None,
+            "conflicts": self.conflicts,
+        }
+
+
+def _name_map(rows) -> Dict[str, object]:
+    names: Dict[str, object] = {}
+    for entity_id, name in rows:
+        key = (name or "").strip()
+        names[key] = _AMBIGUOUS if key in names else str(entity_id)
+    return names
+
+
+def _parse_slot_time(value) -> Optional[time]:
+    if isinstance(value, datetime):
+        return value.time()
+    if isinstance(value, time):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value.strip(), "%H:%M").time()
+        except ValueError:
+            return None
+    return None
+
+
+def _year_hint(filename: Optional[str]) -> Optional[int]:
+    match = FILENAME_DATE_PATTERN.search(os.path.basename(filename or ""))
+    return int(match.group(1)) if match else None
+
+
+def import_route_workbook(
+    db: Session,
+    source: Union[str, BinaryIO],
+    filename: Optional[str] = None,
+    year: Optional[int] = None,
+    mark_completed: bool = False,
+    dry_run: bool = False,
+) -> dict:
+    """
+    ルート表ブックを取り込み、結果サマリー（取込件数・conflicts）を返す
+    year 未指定時はファイル名の日付（ikaruRoute_YYYYMMDD...）→ 今年の順に決める
+    mark_completed=True の場合、当日より前の訪問は予定時刻を実績として完了扱いで登録する
+    （売上は python manage.py recalculate-revenue で作成する）
+    commitは呼び出し元（dry_run時は何も書き込まない）
+    ブックとして読めない場合は ValueError
+    """
+    if filename is None and isinstance(source, str):
+        filename = source
+    year = year or _year_hint(filename) or date.today().year
+
+    clients = _name_map(db.query(models.Client.client_id, models.Client.name))
+    staff = _name_map(db.query(models.Staff.staff_id, models.Staff.name))
+
+    result = ImportResult()
+    rows = []
+    seen = set()
+    try:
+        wb = load_workbook(source, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        raise ValueError("Excelファイルとして読み込めません") from e
+    try:
+        previous_month = None
+        for ws in wb.worksheets:
+            match = SHEET_TITLE_PATTERN.match(ws.title)
+            if not match:
+                # 売上集計・進捗率シートなど
+                continue
+            month, day = int(match.group(1)), int(match.group(2))
+            # 年をまたぐ期間ブック（12月→1月）
+            if previous_month is not None and month < previous_month:
+                year += 1
+            previous_month = month
+            sheet_date = date(year, month, day)
+            result.sheets += 1
+            result.dates.append(sheet_date)
+            _read_sheet(ws, sheet_date, clients, staff, rows, seen, result)
+    finally:
+        wb.close()
+
+    rows = _drop_existing(db, rows, result)
+
+    today = date.today()
+    for row in rows:
+        row.pop("_cell")
+        if mark_completed and row["date"] < today:
+            row["status"] = models.VisitStatusEnum.completed.value
+            row["actual_start"] = row["scheduled_start"]
+            row["actual_end"] = row["scheduled_end"]
+    result.imported = len(rows)
+
+    if not dry_run and rows:
+        for offset in range(0, len(rows), CHUNK_SIZE):
+            db.execute(insert(models.Visit), rows[offset:offset + CHUNK_SIZE])
+        record_visit_inserts(db, rows)
+        bump_data_version(db, *{row["date"] for row in rows})
+
+    summary = result.to_dict()
+    summary["dry_run"] = dry_run
+    return summary
+
+
+def _read_sheet(ws, sheet_date: date, clients: dict, staff: dict, rows: list, seen: set, result: ImportResult):
+    header: List[Tuple[int, Optional[object]]] = []
+    for row_idx, values in enumerate(ws.iter_rows(values_only=True), start=1):
+        if row_idx == 1:
+            # スタッフ列（B列以降）
+            header = [(col_idx, staff.get(str(name).strip()) if name else None)
+                      for col_idx, name in enumerate(values[1:], start=2)]
+            continue
+        if not values or values[0] == "集計":
+            continue
+        slot_time = _parse_slot_time(values[0])
+        if slot_time is None:
+            continue
+        visit_date = sheet_date + timedelta(days=1) if slot_time.hour < START_HOUR else sheet_date
+
+        for col_idx, staff_id in header:
+            text = values[col_idx - 1] if col_idx - 1 < len(values) else None
+            if text is None or str(text).strip() == "":
+                continue
+            text = str(text).strip()
+            cell = f"{get_column_letter(col_idx)}{row_idx}"
+            result.cells += 1
+
+            def conflict(reason: str):
+                result.conflicts.append({"sheet": ws.title, "cell": cell, "text": text, "reason": reason})
+
+            match = CELL_PATTERN.match(text)
+            if not match:
+                conflict("形式不正")
+                continue
+            if staff_id is None:
+                conflict("スタッフ不明")
+                continue
+            client_id = clients.get(match.group("client").strip())
+            companion_id = None
+            if match.group("companion"):
+                companion_id = staff.get(match.group("companion").strip())
+                if companion_id is None:
+                    conflict("同行スタッフ不明")
+                    continue
+            if client_id is None:
+                conflict("利用者不明")
+                continue
+            if _AMBIGUOUS in (staff_id, client_id, companion_id):
+                conflict("同名が複数登録されています")
+                continue
+
+            start = datetime.combine(visit_date, slot_time)
+            if (client_id, start) in seen:
+                conflict("重複（ファイル内）")
+                continue
+            seen.add((client_id, start))
+
+            rows.append({
+                "_cell": (ws.title, cell, text),
+                "visit_id": models.gen_uuid(),
+                "client_id": client_id,
+                "staff_id": staff_id,
+                "companion_staff_id": companion_id,
+                "visit_type": "two_staff" if companion_id else "normal",
+                "service_type": match.group("service"),
+                "scheduled_start": start,
+                "scheduled_end": start + timedelta(minutes=int(match.group("duration"))),
+                "date": visit_date,
+            })
+
+
+def _drop_existing(db: Session, rows: list, result: ImportResult) -> list:
+    """登録済み（同一利用者・同一開始時刻）の訪問を除外"""
+    if not rows:
+        return rows
+    start = min(row["date"] for row in rows)
+    end = max(row["date"] for row in rows) + timedelta(days=1)
+    existing = {
+        (str(client_id), scheduled_start)
+        for client_id, scheduled_start in db.query(
+            models.Visit.client_id, models.Visit.scheduled_start
+        ).filter(date_range_filter(models.Visit.date, start, end))
+    }
+
+    kept = []
+    for row in rows:
+        if (row["client_id"], row["scheduled_start"]) in existing:
+            sheet, cell, text = row["_cell"]
+            result.conflicts.append({"sheet": sheet, "cell": cell, "text": text, "reason": "重複（登録済み）"})
+        else:
+            kept.append(row)
+    return kept
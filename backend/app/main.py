@@ -1,11 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.database import Base, engine
-from app.routers import auth, staff, clients, routes, visits, revenue, reports
-
-# テーブル作成
-Base.metadata.create_all(bind=engine)
+from app.compression import CompressionMiddleware
+from app.pagination import NEXT_CURSOR_HEADER
+from app.routers import auth, staff, clients, routes, visits, revenue, reports, billing, cache, sync
 
 app = FastAPI(
     title="IkaruRoute API",
@@ -23,8 +21,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# レスポンス圧縮（JSON・NDJSON・CSV。xlsx / zip / Parquet / SSE は対象外）
+app.add_middleware(CompressionMiddleware)
+
+
+# スキーマはマイグレーションで作成する（python manage.py migrate）。import時にはDBへ接続しない
+def create_schema():
+    """ローカル開発用: マイグレーションを使わずにテーブルを作成"""
+    from app.database import Base, engine
+    Base.metadata.create_all(bind=engine)
+
+
+if settings.auto_create_schema:
+    app.add_event_handler("startup", create_schema)
+
+
 # ルーター登録
 app.include_router(auth.router)
 app.include_router(staff.router)
@@ -33,6 +47,9 @@ app.include_router(routes.router)
 app.include_router(visits.router)
 app.include_router(revenue.router)
 app.include_router(reports.router)
+app.include_router(billing.router)
+app.include_router(sync.router)
+app.include_router(cache.router)
 
 
 @app.get("/")
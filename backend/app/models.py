@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 from sqlalchemy import (
-    Column, String, Integer, Float, Boolean, DateTime, Date,
+    Column, String, Integer, BigInteger, Float, Boolean, DateTime, Date,
     ForeignKey, JSON, Text, Time
 )
 from sqlalchemy.orm import relationship
@@ -114,7 +114,7 @@ class Route(Base):
     __tablename__ = "routes"
 
     route_id = Column(String(36), primary_key=True, default=gen_uuid)
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, index=True)
     staff_id = Column(String(36), ForeignKey("staff.staff_id"), nullable=False)
     status = Column(String(20), default=RouteStatusEnum.draft.value)
     total_hours = Column(Float, default=0.0)
@@ -144,7 +144,7 @@ class Visit(Base):
     status = Column(String(10), default=VisitStatusEnum.scheduled.value)
     visit_note = Column(Text, nullable=True)
     sort_order = Column(Integer, default=0)
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -166,7 +166,7 @@ class Revenue(Base):
     service_unit_price = Column(Integer, nullable=False, default=0)
     duration_minutes = Column(Integer, nullable=False, default=0)
     calculated_at = Column(DateTime, default=datetime.utcnow)
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, index=True)
 
     visit = relationship("Visit", back_populates="revenue")
     staff = relationship("Staff", back_populates="revenues")
@@ -183,3 +183,56 @@ class StaffTarget(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     staff = relationship("Staff", back_populates="targets")
+
+
+class StaffRevenueDaily(Base):
+    """スタッフ別・日別の売上集計（訪問完了時に更新）"""
+    __tablename__ = "staff_revenue_daily"
+
+    staff_id = Column(String(36), ForeignKey("staff.staff_id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    amount = Column(Integer, nullable=False, default=0)
+    visit_count = Column(Integer, nullable=False, default=0)
+    duration_minutes = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class StaffRevenueMonthly(Base):
+    """スタッフ別・月別の売上集計（訪問完了時に更新）"""
+    __tablename__ = "staff_revenue_monthly"
+
+    staff_id = Column(String(36), ForeignKey("staff.staff_id"), primary_key=True)
+    month = Column(String(7), primary_key=True)  # YYYY-MM
+    amount = Column(Integer, nullable=False, default=0)
+    visit_count = Column(Integer, nullable=False, default=0)
+    duration_minutes = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DataVersion(Base):
+    """
+    データ更新カウンタ（キャッシュ・ETagの鍵）
+    key: 日付（YYYY-MM-DD）ごとの訪問・ルート・売上の更新、または "master"（スタッフ・利用者の更新）
+    """
+    __tablename__ = "data_versions"
+
+    key = Column(String(20), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class VisitChange(Base):
+    """
+    訪問・ルートの変更ログ（追記のみ。差分同期 GET /api/v1/sync 用）
+    書き込み処理と同じトランザクションで app/change_log.py から記録する
+    """
+    __tablename__ = "visit_changes"
+
+    change_id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity = Column(String(10), nullable=False)      # visit / route
+    entity_id = Column(String(36), nullable=False)
+    operation = Column(String(10), nullable=False)   # upsert / delete
+    date = Column(Date, nullable=False)
+    staff_id = Column(String(36), nullable=True, index=True)      # 変更後の担当
+    old_staff_id = Column(String(36), nullable=True, index=True)  # 担当替え前の担当
+    changed_at = Column(DateTime, default=datetime.utcnow)
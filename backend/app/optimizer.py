@@ -3,6 +3,8 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from app import models
+from app.data_version import bump_data_version
+from app.change_log import record_route_change, record_visit_change
 
 
 def generate_optimized_routes(db: Session, target_date, staff_ids: Optional[List] = None):
@@ -106,11 +108,14 @@ def generate_optimized_routes(db: Session, target_date, staff_ids: Optional[List
                         )
                         db.add(route)
                         db.flush()
+                        record_route_change(db, route)
 
                     visit.staff_id = staff.staff_id
                     visit.route_id = route.route_id
+                    record_visit_change(db, visit)
                     break
 
+        bump_data_version(db, target_date)
         db.commit()
 
 
@@ -145,10 +150,13 @@ def _simple_assign(db: Session, target_date, staff_ids: Optional[List] = None):
                     )
                     db.add(route)
                     db.flush()
+                    record_route_change(db, route)
                     staff_routes[str(staff.staff_id)] = route
 
                 visit.staff_id = staff.staff_id
                 visit.route_id = staff_routes[str(staff.staff_id)].route_id
+                record_visit_change(db, visit)
                 break
 
+    bump_data_version(db, target_date)
     db.commit()
@@ -0,0 +1,40 @@
+"""
+キーセット（シーク）ページネーションのヘルパー
+
+OFFSET はページが進むほど読み飛ばす行が増えるため、並び順のキー（例: 開始予定時刻, 訪問ID）の
+最後の値をカーソルとして返し、次ページは「そのキーより後」の行を条件で取得する。
+カーソルはキー値のJSONをURLセーフBase64にした不透明な文字列。
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError
+        return values
+    except ValueError:
+        raise HTTPException(status_code=400, detail="カーソルが不正です")
+
+
+def after_datetime_key(time_column, id_column, cursor: str):
+    """(time_column, id_column) がカーソルより後の行"""
+    start, last_id = decode_cursor(cursor, 2)
+    try:
+        start = datetime.fromisoformat(start)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="カーソルが不正です")
+    return or_(time_column > start, and_(time_column == start, id_column > last_id))
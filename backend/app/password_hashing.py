@@ -0,0 +1,76 @@
+"""
+パスワードハッシュ計算の専用プロセスプール
+
+- ハッシュの計算・照合はCPUを占有するため、他のエンドポイントと共有するスレッドプールでは行わない
+  （始業時のログイン集中で一覧取得などが待たされないようにする）
+- 実行中＋待機中の件数を password_hash_workers + password_hash_queue_size までに制限し、
+  超過時は待たせずに 503（Retry-After付き）を返す
+- ログイン時、ハッシュが現行スキーム（settings.password_schemes の先頭）でなければ
+  新しいハッシュを返すので、呼び出し側で保存し直す
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from app.config import settings
+
+RETRY_AFTER_SECONDS = 2
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(settings.password_hash_workers + settings.password_hash_queue_size)
+
+
+# ===== プロセスプール側 =====
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    from app.auth import pwd_context
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _hash(plain_password: str) -> str:
+    from app.auth import pwd_context
+    return pwd_context.hash(plain_password)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _submit(fn, *args) -> Future:
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="ログインが混み合っています。しばらくしてから再度お試しください",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+    try:
+        future = _get_pool().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+# ===== API側 =====
+async def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """照合結果と、再ハッシュが必要な場合の新しいハッシュ（不要なら None）"""
+    return await asyncio.wrap_future(_submit(_verify_and_update, plain_password, hashed_password))
+
+
+async def hash_password(plain_password: str) -> str:
+    return await asyncio.wrap_future(_submit(_hash, plain_password))
+
+
+def hash_password_blocking(plain_password: str) -> str:
+    """同期エンドポイント用（待機中のスレッドはCPUを使わない）"""
+    return _submit(_hash, plain_password).result()
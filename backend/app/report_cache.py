@@ -0,0 +1,82 @@
+"""
+生成済みレポート（Excel）のディスクキャッシュ
+
+- キーは (対象日, 売上シート有無, データバージョン)。データが更新されるとバージョンが
+  変わるため、古いファイルは参照されなくなり、容量上限を超えた分から削除される
+- 書き込みは一時ファイル → os.replace で行い、複数ワーカーが同じディレクトリを共有しても
+  書きかけのファイルが読まれないようにする
+- 容量上限（settings.report_cache_max_bytes）を超えたら最終アクセスの古い順に削除（LRU）
+"""
+import os
+import tempfile
+import threading
+from datetime import date
+from typing import Iterable, Iterator, Optional
+from app.config import settings
+
+_evict_lock = threading.Lock()
+
+
+def cache_dir() -> str:
+    path = settings.report_cache_dir or os.path.join(tempfile.gettempdir(), "ikaruRoute_reports")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_key(kind: str, target_date: date, include_revenue: bool, version: str) -> str:
+    scope = "rev" if include_revenue else "norev"
+    return f"{kind}_{target_date.strftime('%Y%m%d')}_{scope}_v{version}"
+
+
+def get(key: str, suffix: str = ".xlsx") -> Optional[str]:
+    """キャッシュ済みファイルのパス（なければNone）。ヒット時は最終アクセス時刻を更新"""
+    path = os.path.join(cache_dir(), key + suffix)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def tee(key: str, chunks: Iterable[bytes], suffix: str = ".xlsx") -> Iterator[bytes]:
+    """
+    チャンクをそのまま返しつつキャッシュファイルへ書き込む
+    最後まで送り切れた場合のみキャッシュとして確定する
+    """
+    directory = cache_dir()
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=suffix)
+    completed = False
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(tmp_path, os.path.join(directory, key + suffix))
+        completed = True
+    finally:
+        if not completed and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict(keep=key + suffix)
+
+
+def evict(keep: Optional[str] = None):
+    """容量上限を超えている間、最終アクセスの古いファイルから削除"""
+    directory = cache_dir()
+    with _evict_lock:
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.startswith(".tmp_"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path, entry.name))
+
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, path, name in sorted(entries):
+            if total <= settings.report_cache_max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,224 @@
+"""
+期間（週・月）ルート表Excelのバックグラウンド生成
+
+- 日ごとの集計・シート生成はプロセスプールで並列に行い、APIワーカーを占有しない
+  xlsx: 各プロセスで日別データを集計 → 1日1シートのブックへの書き出しもプロセスプールで行う
+  zip : 各プロセスで日別ブックまで生成 → 親でzipにまとめる（無圧縮で格納するだけ）
+- ジョブの状態はレポートキャッシュ配下の jobs/<job_id>/job.json に保存し、
+  どのワーカーからでも状態確認・ダウンロードできるようにする
+- 完了後 JOB_RETENTION_HOURS を過ぎたジョブは次回ジョブ登録時に削除する
+- 実行中のまま JOB_STALL_SECONDS 以上更新のないジョブ（サーバー再起動で中断されたもの）は、
+  状態確認時に失敗として記録する
+"""
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from app.config import settings
+from app import report_cache
+
+MAX_RANGE_DAYS = 31
+
+JOB_RETENTION_HOURS = 24
+
+# 進捗は1日ごとに保存するため、これだけ更新がなければ実行していたプロセスは終了している
+JOB_STALL_SECONDS = 15 * 60
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+# ===== プロセスプール側 =====
+def _init_worker():
+    # 親プロセスの接続を引き継がず、子プロセスごとに接続を張り直す
+    from app.database import engine, read_engine
+    engine.dispose(close=False)
+    read_engine.dispose(close=False)
+
+
+def _load_day(target_date: date, include_revenue: bool):
+    from app.database import ReadSessionLocal
+    from app.excel_export import load_route_report_data
+    db = ReadSessionLocal()
+    try:
+        return load_route_report_data(db, target_date, include_revenue)
+    finally:
+        db.close()
+
+
+def _load_day_pickled(target_date: date, include_revenue: bool) -> bytes:
+    # 親プロセスで復元すると excel_export（openpyxl）の読み込みが必要になるため、バイト列のまま受け渡す
+    return pickle.dumps(_load_day(target_date, include_revenue))
+
+
+def _write_range_file(days_pickled: List[bytes], path: str) -> str:
+    from app.excel_export import write_range_workbook
+    with open(path, "wb") as f:
+        write_range_workbook([pickle.loads(data) for data in days_pickled], f)
+    return path
+
+
+def _write_day_file(target_date: date, include_revenue: bool, path: str) -> str:
+    from app.excel_export import write_route_workbook
+    data = _load_day(target_date, include_revenue)
+    with open(path, "wb") as f:
+        write_route_workbook(data, f)
+    return path
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.report_export_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+# ===== ジョブ管理 =====
+def _jobs_dir() -> str:
+    path = os.path.join(report_cache.cache_dir(), "jobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(_jobs_dir(), job_id)
+
+
+def _save_job(job: dict):
+    job_dir = _job_path(job["job_id"])
+    tmp_path = os.path.join(job_dir, ".job.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False, default=str)
+    os.replace(tmp_path, os.path.join(job_dir, "job.json"))
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    try:
+        uuid.UUID(job_id)
+        path = os.path.join(_job_path(job_id), "job.json")
+        with open(path, encoding="utf-8") as f:
+            job = json.load(f)
+        updated_at = os.path.getmtime(path)
+    except (ValueError, FileNotFoundError):
+        return None
+
+    if job["status"] in ("queued", "running") and time.time() - updated_at > JOB_STALL_SECONDS:
+        job["status"] = "failed"
+        job["error"] = "ジョブが中断されました（サーバー再起動など）。再度登録してください"
+        job["finished_at"] = datetime.utcnow().isoformat()
+        _save_job(job)
+    return job
+
+
+def job_file_path(job: dict) -> str:
+    return os.path.join(_job_path(job["job_id"]), job["filename"])
+
+
+def _purge_expired_jobs():
+    expire_before = time.time() - JOB_RETENTION_HOURS * 3600
+    for entry in os.scandir(_jobs_dir()):
+        if entry.is_dir() and entry.stat().st_mtime < expire_before:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def submit_route_range_job(
+    start_date: date,
+    end_date: date,
+    include_revenue: bool,
+    output_format: str,
+    requested_by: str,
+) -> dict:
+    """期間Excel生成ジョブを登録してバックグラウンドで開始"""
+    _purge_expired_jobs()
+
+    job_id = str(uuid.uuid4())
+    os.makedirs(_job_path(job_id))
+    period = f"{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}"
+    job = {
+        "job_id": job_id,
+        "status": "queued",
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "format": output_format,
+        "include_revenue": include_revenue,
+        "requested_by": requested_by,
+        "filename": f"ikaruRoute_{period}.{output_format}",
+        "days_total": (end_date - start_date).days + 1,
+        "days_done": 0,
+        "error": None,
+        "created_at": datetime.utcnow().isoformat(),
+        "finished_at": None,
+    }
+    _save_job(job)
+
+    threading.Thread(target=_run_job, args=(job,), daemon=True).start()
+    return job
+
+
+def _run_job(job: dict):
+    start_date = date.fromisoformat(job["start_date"])
+    days = [start_date + timedelta(days=i) for i in range(job["days_total"])]
+    job_dir = _job_path(job["job_id"])
+    tmp_path = os.path.join(job_dir, ".tmp_" + job["filename"])
+
+    job["status"] = "running"
+    _save_job(job)
+    try:
+        if job["format"] == "zip":
+            _build_zip(job, days, job_dir, tmp_path)
+        else:
+            _build_workbook(job, days, tmp_path)
+        os.replace(tmp_path, job_file_path(job))
+        job["status"] = "completed"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    job["finished_at"] = datetime.utcnow().isoformat()
+    _save_job(job)
+
+
+def _build_workbook(job: dict, days: List[date], out_path: str):
+    pool = _get_pool()
+    # 結果は日付順に受け取る（並列実行・順序保持）
+    results = []
+    for data in pool.map(_load_day_pickled, days, [job["include_revenue"]] * len(days)):
+        results.append(data)
+        job["days_done"] += 1
+        _save_job(job)
+
+    # openpyxl での書き出しもCPUを使うためAPIプロセスでは行わない
+    pool.submit(_write_range_file, results, out_path).result()
+
+
+def _build_zip(job: dict, days: List[date], job_dir: str, out_path: str):
+    pool = _get_pool()
+    day_paths = [os.path.join(job_dir, f".day_{d.strftime('%Y%m%d')}.xlsx") for d in days]
+    try:
+        # xlsxは圧縮済みのため無圧縮で格納
+        with zipfile.ZipFile(out_path, "w", compression=zipfile.ZIP_STORED) as zf:
+            for target_date, path in zip(days, pool.map(
+                _write_day_file, days, [job["include_revenue"]] * len(days), day_paths
+            )):
+                zf.write(path, arcname=f"ikaruRoute_{target_date.strftime('%Y%m%d')}.xlsx")
+                os.remove(path)
+                job["days_done"] += 1
+                _save_job(job)
+    finally:
+        for path in day_paths:
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,218 @@
+"""
+日次ビュー（訪問一覧・ルート一覧・進捗）のレスポンスキャッシュ
+
+- シリアライズ済みのレスポンス本文（bytes）を保持する
+- キーは ETag と同じ（エンドポイント・閲覧範囲・クエリ・データバージョン）のため、
+  書き込みでバージョンが進めば古いエントリは参照されなくなる
+- bump_data_version() / bump_master_version() から該当日（または全体）のエントリを破棄する
+- gzip / brotli で圧縮した本文も「キー:方式」で保持し、ヒット時は圧縮し直さずに返す
+- バックエンドは settings.response_cache_url で切替
+    memory://          プロセス内のLRU（件数上限・TTL付き、単一ワーカー・テスト用）
+    redis://host:6379  Redis（TTL付き、複数ワーカーで共有）
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple
+from app.compression import compress
+from app.config import settings
+
+KEY_PREFIX = "ikaruRoute:response:"
+# Redisバックエンドのタグ別キー集合
+TAG_KEY_PREFIX = "ikaruRoute:response-tags:"
+
+
+class LocalCacheBackend:
+    """
+    プロセス内のLRU（件数上限・TTL）
+    値は bytes 以外もそのまま保持する（認証結果のキャッシュ auth.principal_cache でも使う）
+    """
+
+    def __init__(self, max_entries: int, ttl: int):
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._ttl = ttl
+
+    def get(self, tag: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get((tag, key))
+            if entry is None:
+                return None
+            expires_at, body = entry
+            if expires_at < time.monotonic():
+                del self._entries[(tag, key)]
+                return None
+            self._entries.move_to_end((tag, key))
+            return body
+
+    def set(self, tag: str, key: str, body: bytes):
+        with self._lock:
+            self._entries[(tag, key)] = (time.monotonic() + self._ttl, body)
+            self._entries.move_to_end((tag, key))
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tag: str):
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] == tag]:
+                del self._entries[entry_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Redis上で全ワーカーが共有するバックエンド（容量はRedis側のmaxmemoryで管理）
+    タグ（日付）ごとにエントリのキーを集合で持ち、invalidate はその集合のキーだけを削除する
+    （書き込みのたびにキー空間全体を SCAN しない）
+    """
+
+    def __init__(self, url: str, ttl: int):
+        import redis  # 複数ワーカー構成時のみ必要
+
+        self._client = redis.Redis.from_url(url)
+        self._ttl = ttl
+
+    @staticmethod
+    def _key(tag: str, key: str) -> str:
+        return f"{KEY_PREFIX}{tag}:{key}"
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"{TAG_KEY_PREFIX}{tag}"
+
+    def get(self, tag: str, key: str) -> Optional[bytes]:
+        return self._client.get(self._key(tag, key))
+
+    def set(self, tag: str, key: str, body: bytes):
+        entry_key = self._key(tag, key)
+        tag_key = self._tag_key(tag)
+        pipe = self._client.pipeline(transaction=False)
+        pipe.set(entry_key, body, ex=self._ttl)
+        pipe.sadd(tag_key, entry_key)
+        # 集合は最後に追加したエントリと同じだけ残す（期限切れのキーが残っても削除時に無視される）
+        pipe.expire(tag_key, self._ttl)
+        pipe.execute()
+
+    def invalidate(self, tag: str):
+        tag_key = self._tag_key(tag)
+        keys = list(self._client.smembers(tag_key))
+        if not keys:
+            return
+        pipe = self._client.pipeline(transaction=False)
+        pipe.delete(*keys)
+        # 取得後に追加されたキーは集合に残す
+        pipe.srem(tag_key, *keys)
+        pipe.execute()
+
+    def clear(self):
+        # 管理用の全消去のみ SCAN を使う
+        for pattern in (f"{KEY_PREFIX}*", f"{TAG_KEY_PREFIX}*"):
+            keys = list(self._client.scan_iter(match=pattern, count=500))
+            if keys:
+                self._client.delete(*keys)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "errors": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _lookup(self, tag: str, key: str, count_miss: bool = True) -> Optional[bytes]:
+        try:
+            body = self._backend.get(tag, key)
+        except Exception:
+            self._count("errors")
+            return None
+        if body is not None:
+            self._count("hits")
+        elif count_miss:
+            self._count("misses")
+        return body
+
+    def _store(self, tag: str, key: str, body: bytes):
+        try:
+            self._backend.set(tag, key, body)
+        except Exception:
+            self._count("errors")
+
+    def get_or_build(self, tag: str, key: str, build: Callable[[], bytes]) -> bytes:
+        """キャッシュ済みの本文を返す。なければ build() して保存（キャッシュ障害時は毎回build）"""
+        body = self._lookup(tag, key)
+        if body is None:
+            body = build()
+            self._store(tag, key, body)
+        return body
+
+    async def get_or_build_async(self, tag: str, key: str, build: Callable[[], Awaitable[bytes]]) -> bytes:
+        """get_or_build() の async エンドポイント用"""
+        body = self._lookup(tag, key)
+        if body is None:
+            body = await build()
+            self._store(tag, key, body)
+        return body
+
+    async def get_or_build_encoded_async(
+        self, tag: str, key: str, encoding: Optional[str], build: Callable[[], Awaitable[bytes]]
+    ) -> Tuple[bytes, Optional[str]]:
+        """
+        encoding（gzip / br）で圧縮済みの本文を返す。なければ元の本文を取得（または build）して圧縮・保存
+        本文が圧縮の最小サイズ未満の場合は未圧縮の本文と None を返す
+        """
+        if encoding:
+            # 圧縮版がなければ元の本文の参照で数える
+            body = self._lookup(tag, f"{key}:{encoding}", count_miss=False)
+            if body is not None:
+                return body, encoding
+        body = await self.get_or_build_async(tag, key, build)
+        if not encoding or len(body) < settings.compression_minimum_size:
+            return body, None
+        encoded = compress(body, encoding)
+        self._store(tag, f"{key}:{encoding}", encoded)
+        return encoded, encoding
+
+    def invalidate(self, tag: str):
+        self._count("invalidations")
+        try:
+            self._backend.invalidate(tag)
+        except Exception:
+            self._count("errors")
+
+    def clear(self):
+        self._count("invalidations")
+        try:
+            self._backend.clear()
+        except Exception:
+            self._count("errors")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups * 100, 1) if lookups else 0
+        stats["backend"] = type(self._backend).__name__
+        stats["entries"] = self._backend.size()
+        return stats
+
+
+def _create_backend(url: str):
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        return RedisCacheBackend(url, settings.response_cache_ttl)
+    return LocalCacheBackend(settings.response_cache_max_entries, settings.response_cache_ttl)
+
+
+response_cache = ResponseCache(_create_backend(settings.response_cache_url))
@@ -0,0 +1,163 @@
+"""
+売上の一括再計算
+
+ケアプラン単価の変更や計算ロジック修正時に、完了済み訪問の売上（revenues）を
+期間・スタッフ・利用者単位でまとめて再計算する。
+訪問はタプルで一括取得し、既存売上の照合と更新をチャンク単位のバルクSQLで行う。
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Optional, Tuple
+from sqlalchemy import and_, insert, or_, update
+from sqlalchemy.orm import Session
+from app import models
+from app.date_filters import date_range_filter
+from app.revenue_rollup import rebuild_rollups
+from app.data_version import bump_data_version
+
+DEFAULT_UNIT_PRICE = 2500
+
+CHUNK_SIZE = 2000
+
+
+def compute_revenue(actual_start: datetime, actual_end: datetime, unit_price: int) -> Tuple[int, int]:
+    """実績時刻と単価から (稼働分数, 売上額) を算出"""
+    duration_minutes = int((actual_end - actual_start).total_seconds() / 60)
+    return duration_minutes, int(duration_minutes / 60 * unit_price)
+
+
+def recalculate_revenue(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    staff_id: Optional[str] = None,
+    client_id: Optional[str] = None,
+    dry_run: bool = False,
+) -> dict:
+    """
+    期間内（両端含む）の完了訪問について売上を再計算し、差分サマリーを返す
+    staff_id 指定時は主担当・同行のどちらかが該当する訪問が対象
+    commitは呼び出し元（dry_run時は何も書き込まない）
+    """
+    end_exclusive = date.fromordinal(end_date.toordinal() + 1)
+    query = db.query(
+        models.Visit.visit_id,
+        models.Visit.staff_id,
+        models.Visit.companion_staff_id,
+        models.Visit.visit_type,
+        models.Visit.date,
+        models.Visit.actual_start,
+        models.Visit.actual_end,
+        models.ServicePlan.unit_price
+    ).outerjoin(
+        models.ServicePlan, models.ServicePlan.plan_id == models.Visit.plan_id
+    ).filter(
+        and_(
+            date_range_filter(models.Visit.date, start_date, end_exclusive),
+            models.Visit.status == models.VisitStatusEnum.completed,
+            models.Visit.staff_id != None,
+            models.Visit.actual_start != None,
+            models.Visit.actual_end != None
+        )
+    )
+    if staff_id:
+        query = query.filter(or_(
+            models.Visit.staff_id == staff_id,
+            models.Visit.companion_staff_id == staff_id
+        ))
+    if client_id:
+        query = query.filter(models.Visit.client_id == client_id)
+    visits = query.all()
+
+    summary = {
+        "visits_scanned": len(visits),
+        "revenues_updated": 0,
+        "revenues_created": 0,
+        "revenues_unchanged": 0,
+        "amount_before": 0,
+        "amount_after": 0,
+        "staff_diffs": defaultdict(int),
+    }
+
+    changed_dates = set()
+    for offset in range(0, len(visits), CHUNK_SIZE):
+        _recalculate_chunk(db, visits[offset:offset + CHUNK_SIZE], summary, changed_dates, dry_run)
+
+    if not dry_run and changed_dates:
+        rebuild_rollups(db, start_date, end_date)
+        bump_data_version(db, *changed_dates)
+
+    summary["amount_diff"] = summary["amount_after"] - summary["amount_before"]
+    summary["staff_diffs"] = {sid: diff for sid, diff in summary["staff_diffs"].items() if diff}
+    summary["dry_run"] = dry_run
+    return summary
+
+
+def _recalculate_chunk(db: Session, visits, summary: dict, changed_dates: set, dry_run: bool):
+    existing = defaultdict(list)
+    for row in db.query(
+        models.Revenue.revenue_id,
+        models.Revenue.visit_id,
+        models.Revenue.staff_id,
+        models.Revenue.amount,
+        models.Revenue.duration_minutes,
+        models.Revenue.service_unit_price
+    ).filter(models.Revenue.visit_id.in_([v.visit_id for v in visits])):
+        existing[row.visit_id].append(row)
+
+    updates = []
+    inserts = []
+    for v in visits:
+        unit_price = v.unit_price if v.unit_price is not None else DEFAULT_UNIT_PRICE
+        duration_minutes, amount = compute_revenue(v.actual_start, v.actual_end, unit_price)
+        rows = existing.get(v.visit_id, [])
+
+        # 主担当分（_calculate_revenue と同じく同行スタッフ以外の行を主担当分とみなす）
+        targets = [(
+            v.staff_id,
+            next((r for r in rows if r.staff_id != v.companion_staff_id), None)
+        )]
+        # 2人体制の同行スタッフ分
+        if v.companion_staff_id and v.visit_type == "two_staff":
+            targets.append((
+                v.companion_staff_id,
+                next((r for r in rows if r.staff_id == v.companion_staff_id), None)
+            ))
+
+        for target_staff_id, current in targets:
+            summary["amount_after"] += amount
+            if current is None:
+                summary["revenues_created"] += 1
+                summary["staff_diffs"][str(target_staff_id)] += amount
+                changed_dates.add(v.date)
+                inserts.append({
+                    "visit_id": v.visit_id,
+                    "staff_id": target_staff_id,
+                    "amount": amount,
+                    "service_unit_price": unit_price,
+                    "duration_minutes": duration_minutes,
+                    "date": v.date,
+                })
+                continue
+
+            summary["amount_before"] += current.amount
+            if (current.amount, current.duration_minutes, current.service_unit_price) == (amount, duration_minutes, unit_price):
+                summary["revenues_unchanged"] += 1
+                continue
+            summary["revenues_updated"] += 1
+            summary["staff_diffs"][str(current.staff_id)] += amount - current.amount
+            changed_dates.add(v.date)
+            updates.append({
+                "revenue_id": current.revenue_id,
+                "amount": amount,
+                "service_unit_price": unit_price,
+                "duration_minutes": duration_minutes,
+                "calculated_at": datetime.utcnow(),
+            })
+
+    if dry_run:
+        return
+    if updates:
+        db.execute(update(models.Revenue), updates)
+    if inserts:
+        db.execute(insert(models.Revenue), inserts)
@@ -0,0 +1,97 @@
+"""
+売上ロールアップ（staff_revenue_daily / staff_revenue_monthly）の更新と再構築
+
+- 売上レコードの増減は apply_revenue_delta() で呼び出し元と同じトランザクション内に加算する
+- 集計表が壊れた・過去データを取り込んだ場合は rebuild_rollups() で revenues から再構築する
+  （CLI: python manage.py rebuild-rollups）
+"""
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app import models
+from app.database import increment_counters
+from app.date_filters import date_range_filter, next_month
+
+
+def month_key(target_date: date) -> str:
+    return target_date.strftime("%Y-%m")
+
+
+def apply_revenue_delta(
+    db: Session,
+    staff_id: str,
+    revenue_date: date,
+    amount: int,
+    visit_count: int,
+    duration_minutes: int,
+):
+    """売上の増減分を日次・月次ロールアップへ加算"""
+    if not (amount or visit_count or duration_minutes):
+        return
+    deltas = {"amount": amount, "visit_count": visit_count, "duration_minutes": duration_minutes}
+    increment_counters(db, models.StaffRevenueDaily, {"staff_id": str(staff_id), "date": revenue_date}, deltas)
+    increment_counters(db, models.StaffRevenueMonthly, {"staff_id": str(staff_id), "month": month_key(revenue_date)}, deltas)
+
+
+def rebuild_rollups(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> dict:
+    """
+    revenues から集計表を再構築（commitは呼び出し元）
+    start/end（両端含む）を指定した場合は、その期間を含む月単位で作り直す
+    """
+    if start is None or end is None:
+        bounds = db.query(func.min(models.Revenue.date), func.max(models.Revenue.date)).one()
+        start = start or bounds[0] or end
+        end = end or bounds[1] or start
+
+    # 月次と整合させるため月境界に広げる
+    first_day = start.replace(day=1) if start else None
+    end_day = next_month(end.replace(day=1)) if end else None
+
+    daily_query = db.query(models.StaffRevenueDaily)
+    monthly_query = db.query(models.StaffRevenueMonthly)
+    if first_day and end_day:
+        daily_query = daily_query.filter(date_range_filter(models.StaffRevenueDaily.date, first_day, end_day))
+        monthly_query = monthly_query.filter(
+            models.StaffRevenueMonthly.month >= month_key(first_day),
+            models.StaffRevenueMonthly.month < month_key(end_day),
+        )
+    daily_query.delete(synchronize_session=False)
+    monthly_query.delete(synchronize_session=False)
+
+    if not (first_day and end_day):
+        # 売上データなし
+        return {"daily_rows": 0, "monthly_rows": 0}
+
+    rows = db.query(
+        models.Revenue.staff_id,
+        models.Revenue.date,
+        func.sum(models.Revenue.amount),
+        func.count(models.Revenue.revenue_id),
+        func.sum(models.Revenue.duration_minutes)
+    ).filter(
+        date_range_filter(models.Revenue.date, first_day, end_day)
+    ).group_by(models.Revenue.staff_id, models.Revenue.date).all()
+
+    now = datetime.utcnow()
+    daily = []
+    monthly = {}
+    for staff_id, revenue_date, amount, visit_count, minutes in rows:
+        daily.append({
+            "staff_id": staff_id, "date": revenue_date, "amount": amount,
+            "visit_count": visit_count, "duration_minutes": minutes, "updated_at": now,
+        })
+        key = (staff_id, month_key(revenue_date))
+        total = monthly.setdefault(key, {
+            "staff_id": staff_id, "month": key[1], "amount": 0,
+            "visit_count": 0, "duration_minutes": 0, "updated_at": now,
+        })
+        total["amount"] += amount
+        total["visit_count"] += visit_count
+        total["duration_minutes"] += minutes
+
+    if daily:
+        db.execute(models.StaffRevenueDaily.__table__.insert(), daily)
+        db.execute(models.StaffRevenueMonthly.__table__.insert(), list(monthly.values()))
+
+    return {"daily_rows": len(daily), "monthly_rows": len(monthly)}
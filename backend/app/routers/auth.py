@@ -1,26 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app import models, schemas
-from app.auth import verify_password, create_access_token, get_current_user
+from app.auth import create_access_token, get_current_user, Principal
+from app.password_hashing import verify_and_update
 
 router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
 
 
-@router.post("/login", response_model=schemas.Token)
-def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db)):
-    """ログイン（JWT発行）"""
-    staff = db.query(models.Staff).filter(
-        models.Staff.email == login_data.email,
+def _find_active_staff(db: Session, email: str):
+    staff = db.query(
+        models.Staff.staff_id, models.Staff.role, models.Staff.name, models.Staff.hashed_password
+    ).filter(
+        models.Staff.email == email,
         models.Staff.is_active == True
     ).first()
+    # 照合を待つ間DB接続を保持しないよう、ここでトランザクションを終える
+    db.commit()
+    return staff
+
+
+def _save_password_hash(db: Session, staff_id: str, hashed_password: str):
+    db.query(models.Staff).filter(models.Staff.staff_id == staff_id).update({"hashed_password": hashed_password})
+    db.commit()
+
 
-    if not staff or not verify_password(login_data.password, staff.hashed_password):
+@router.post("/login", response_model=schemas.Token)
+async def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db)):
+    """
+    ログイン（JWT発行）
+    パスワード照合は専用プロセスプールで行う（app/password_hashing.py）。DBアクセスはスレッドプールで実行
+    """
+    staff = await run_in_threadpool(_find_active_staff, db, login_data.email)
+    verified, new_hash = (False, None)
+    if staff:
+        verified, new_hash = await verify_and_update(login_data.password, staff.hashed_password)
+
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="メールアドレスまたはパスワードが正しくありません"
         )
 
+    # 旧方式のハッシュは現行方式で保存し直す
+    if new_hash:
+        await run_in_threadpool(_save_password_hash, db, staff.staff_id, new_hash)
+
     access_token = create_access_token(data={
         "sub": str(staff.staff_id),
         "role": staff.role,
@@ -37,6 +63,12 @@ def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=schemas.StaffResponse)
-def get_me(current_user: models.Staff = Depends(get_current_user)):
+def get_me(
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
     """現在のユーザー情報取得"""
-    return current_user
+    staff = db.query(models.Staff).filter(models.Staff.staff_id == current_user.staff_id).first()
+    if not staff:
+        raise HTTPException(status_code=404, detail="スタッフが見つかりません")
+    return staff
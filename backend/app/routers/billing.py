@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.database import get_read_db
+from app.auth import require_admin, Principal
+
+router = APIRouter(prefix="/api/v1/billing", tags=["billing"])
+
+
+@router.get("/monthly/{target_month}")
+def get_monthly_billing(
+    target_month: str,  # YYYY-MM
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """月次介護報酬計算（利用者別・スタッフ別・管理者のみ）"""
+    from app.billing import calculate_monthly_billing  # numpy は初回利用時に読み込む（起動時間短縮）
+
+    try:
+        return calculate_monthly_billing(db, target_month)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
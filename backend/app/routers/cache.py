@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+from app.auth import require_admin, Principal
+from app.response_cache import response_cache
+
+router = APIRouter(prefix="/api/v1/cache", tags=["cache"])
+
+
+@router.get("/stats")
+def get_cache_stats(
+    current_user: Principal = Depends(require_admin)
+):
+    """レスポンスキャッシュのヒット率等（このワーカー分・管理者のみ）"""
+    return response_cache.stats()
@@ -1,17 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app import models, schemas
-from app.auth import get_current_user, require_coordinator_or_above
+from app.data_version import bump_master_version
+from app.auth import get_current_user, require_coordinator_or_above, Principal
 
 router = APIRouter(prefix="/api/v1/clients", tags=["clients"])
 
 
 @router.get("/", response_model=List[schemas.ClientResponse])
 def get_clients(
-    db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_coordinator_or_above)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_coordinator_or_above)
 ):
     """利用者一覧（コーディネーター以上）"""
     return db.query(models.Client).filter(models.Client.is_active == True).all()
@@ -20,8 +21,8 @@ def get_clients(
 @router.get("/{client_id}", response_model=schemas.ClientResponse)
 def get_client(
     client_id: str,
-    db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_coordinator_or_above)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_coordinator_or_above)
 ):
     client = db.query(models.Client).filter(models.Client.client_id == client_id).first()
     if not client:
@@ -33,11 +34,12 @@ def get_client(
 def create_client(
     client_data: schemas.ClientCreate,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_coordinator_or_above)
+    current_user: Principal = Depends(require_coordinator_or_above)
 ):
     """利用者登録（コーディネーター以上）"""
     client = models.Client(**client_data.model_dump())
     db.add(client)
+    bump_master_version(db)
     db.commit()
     db.refresh(client)
     return client
@@ -48,7 +50,7 @@ def update_client(
     client_id: str,
     client_data: schemas.ClientUpdate,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_coordinator_or_above)
+    current_user: Principal = Depends(require_coordinator_or_above)
 ):
     client = db.query(models.Client).filter(models.Client.client_id == client_id).first()
     if not client:
@@ -57,6 +59,7 @@ def update_client(
     for key, value in client_data.model_dump(exclude_unset=True).items():
         setattr(client, key, value)
 
+    bump_master_version(db)
     db.commit()
     db.refresh(client)
     return client
@@ -66,10 +69,11 @@ def update_client(
 def delete_client(
     client_id: str,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_coordinator_or_above)
+    current_user: Principal = Depends(require_coordinator_or_above)
 ):
     client = db.query(models.Client).filter(models.Client.client_id == client_id).first()
     if not client:
         raise HTTPException(status_code=404, detail="利用者が見つかりません")
     client.is_active = False
+    bump_master_version(db)
     db.commit()
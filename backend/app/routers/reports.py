@@ -1,29 +1,167 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import date
-from app.database import get_db
-from app import models
-from app.auth import require_coordinator_or_above, require_admin
-from app.excel_export import generate_route_excel
+from typing import Optional
+from app.database import get_db, get_read_db
+from app import models, schemas
+from app.auth import require_coordinator_or_above, require_admin, Principal
+from app.data_version import get_data_version
+from app.conditional import CACHE_CONTROL, etag_matches, not_modified
+from app import analytics_export, report_cache, report_jobs
 
 router = APIRouter(prefix="/api/v1/reports", tags=["reports"])
 
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
 
 @router.get("/excel/{target_date}")
 def download_route_excel(
     target_date: date,
-    db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_coordinator_or_above)
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_coordinator_or_above)
 ):
-    """日次ルート表Excelダウンロード"""
+    """日次ルート表Excelダウンロード（データ未更新なら生成済みファイルを返す）"""
     include_revenue = current_user.role in [models.RoleEnum.admin, models.RoleEnum.coordinator]
 
-    excel_buffer = generate_route_excel(db, target_date, include_revenue=include_revenue)
-
+    key = report_cache.cache_key("route", target_date, include_revenue, get_data_version(db, target_date))
+    etag = f'"{key}"'
     filename = f"ikaruRoute_{target_date.strftime('%Y%m%d')}.xlsx"
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    cached_path = report_cache.get(key)
+    if cached_path:
+        return FileResponse(cached_path, media_type=XLSX_MEDIA_TYPE, filename=filename, headers=headers)
+
+    from app.excel_export import generate_route_excel  # openpyxl は初回利用時に読み込む（起動時間短縮）
+
+    excel_stream = generate_route_excel(db, target_date, include_revenue=include_revenue)
     return StreamingResponse(
-        excel_buffer,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        report_cache.tee(key, excel_stream),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={**headers, "Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.get("/export")
+def export_visits(
+    start: date,
+    end: date,
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    current_user: Principal = Depends(require_coordinator_or_above)
+):
+    """分析用 訪問・売上データ出力（CSV / Parquet。売上の列は管理者のみ）"""
+    if end < start:
+        raise HTTPException(status_code=400, detail="終了日は開始日以降を指定してください")
+    include_revenue = current_user.role == models.RoleEnum.admin
+
+    period = f"{start.strftime('%Y%m%d')}_{end.strftime('%Y%m%d')}"
+    if format == "parquet":
+        if not analytics_export.parquet_available():
+            raise HTTPException(status_code=400, detail="Parquet出力にはpyarrowのインストールが必要です")
+        body = analytics_export.stream_parquet(start, end, include_revenue)
+        media_type = PARQUET_MEDIA_TYPE
+    else:
+        body = analytics_export.stream_csv(start, end, include_revenue)
+        media_type = "text/csv"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=ikaruRoute_visits_{period}.{format}"}
+    )
+
+
+@router.post("/excel/range", status_code=status.HTTP_202_ACCEPTED)
+def create_route_excel_range_job(
+    request_data: schemas.RouteExcelRangeRequest,
+    current_user: Principal = Depends(require_coordinator_or_above)
+):
+    """期間（週・月）ルート表Excel生成ジョブ登録"""
+    if request_data.end_date < request_data.start_date:
+        raise HTTPException(status_code=400, detail="終了日は開始日以降を指定してください")
+    if (request_data.end_date - request_data.start_date).days + 1 > report_jobs.MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"期間は{report_jobs.MAX_RANGE_DAYS}日以内で指定してください"
+        )
+
+    include_revenue = current_user.role in [models.RoleEnum.admin, models.RoleEnum.coordinator]
+    job = report_jobs.submit_route_range_job(
+        request_data.start_date,
+        request_data.end_date,
+        include_revenue,
+        request_data.format,
+        requested_by=str(current_user.staff_id)
     )
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"{router.prefix}/jobs/{job['job_id']}",
+        "download_url": f"{router.prefix}/jobs/{job['job_id']}/download",
+    }
+
+
+def _get_own_job(job_id: str, current_user: Principal) -> dict:
+    job = report_jobs.get_job(job_id)
+    if not job or (
+        job["requested_by"] != str(current_user.staff_id)
+        and current_user.role != models.RoleEnum.admin
+    ):
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+def get_report_job(
+    job_id: str,
+    current_user: Principal = Depends(require_coordinator_or_above)
+):
+    """レポート生成ジョブの状態取得"""
+    job = _get_own_job(job_id, current_user)
+    return {k: v for k, v in job.items() if k != "requested_by"}
+
+
+@router.get("/jobs/{job_id}/download")
+def download_report_job(
+    job_id: str,
+    current_user: Principal = Depends(require_coordinator_or_above)
+):
+    """レポート生成ジョブの成果物ダウンロード"""
+    job = _get_own_job(job_id, current_user)
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail="レポートはまだ生成されていません")
+
+    media_type = XLSX_MEDIA_TYPE if job["format"] == "xlsx" else "application/zip"
+    return FileResponse(report_jobs.job_file_path(job), media_type=media_type, filename=job["filename"])
+
+
+@router.post("/import")
+def import_route_excel(
+    file: UploadFile = File(...),
+    year: Optional[int] = None,
+    mark_completed: bool = False,
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """過去のルート表Excel取込"""
+    if not (file.filename or "").endswith(".xlsx"):
+        raise HTTPException(status_code=400, detail="xlsxファイルを指定してください")
+    from app.excel_import import import_route_workbook  # openpyxl は初回利用時に読み込む
+
+    try:
+        result = import_route_workbook(
+            db, file.file, filename=file.filename, year=year,
+            mark_completed=mark_completed, dry_run=dry_run
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not dry_run:
+        db.commit()
+    return result
@@ -1,53 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import and_, func
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import date
-from app.database import get_db
+from app.database import get_async_db, get_db, get_read_db
 from app import models, schemas
-from app.auth import get_current_user, require_coordinator_or_above, require_admin
+from app.auth import get_current_user, require_coordinator_or_above, require_admin, Principal
+from app.date_filters import date_range_filter, month_range, next_month, parse_month
+from app.revenue_rollup import month_key
+from app.revenue_batch import recalculate_revenue
 
 router = APIRouter(prefix="/api/v1/revenue", tags=["revenue"])
 
 
 @router.get("/summary/{target_date}", response_model=List[schemas.RevenueSummary])
-def get_revenue_summary(
+async def get_revenue_summary(
     target_date: date,
-    db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_coordinator_or_above)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_coordinator_or_above)
 ):
     """
     日次売上サマリー（管理者・コーディネーターのみ）
     権限なしは404を返す（エンドポイントの存在を隠す）
     """
-    staff_list = db.query(models.Staff).filter(models.Staff.is_active == True).all()
-    result = []
+    rows = await db.run_sync(_daily_summary_rows, target_date)
 
-    for staff in staff_list:
-        # 当日の売上合計
-        revenues = db.query(models.Revenue).filter(
-            and_(
-                models.Revenue.staff_id == staff.staff_id,
-                models.Revenue.date == target_date
-            )
-        ).all()
-
-        today_revenue = sum(r.amount for r in revenues)
-        visit_count = len(revenues)
-
-        # 日次目標取得
-        target = db.query(models.StaffTarget).filter(
-            and_(
-                models.StaffTarget.staff_id == staff.staff_id,
-                models.StaffTarget.target_type == "daily"
-            )
-        ).first()
-        target_amount = target.target_amount if target else 0
+    result = []
+    for staff_id, staff_name, today_revenue, visit_count, target_amount in rows:
         achievement_rate = (today_revenue / target_amount * 100) if target_amount > 0 else 0
 
         result.append(schemas.RevenueSummary(
-            staff_id=staff.staff_id,
-            staff_name=staff.name,
+            staff_id=staff_id,
+            staff_name=staff_name,
             today_revenue=today_revenue,
             visit_count=visit_count,
             target_amount=target_amount,
@@ -57,12 +42,39 @@ def get_revenue_summary(
     return result
 
 
+def _daily_summary_rows(db: Session, target_date: date):
+    """有効スタッフごとの (ID, 氏名, 当日売上, 訪問件数, 日次目標)"""
+    # 当日の売上合計（日次ロールアップ）
+    revenue_sq = db.query(
+        models.StaffRevenueDaily.staff_id.label("staff_id"),
+        models.StaffRevenueDaily.amount.label("total"),
+        models.StaffRevenueDaily.visit_count.label("count")
+    ).filter(
+        models.StaffRevenueDaily.date == target_date
+    ).subquery()
+
+    # 日次目標
+    target_sq = _target_subquery(db, "daily")
+
+    return db.query(
+        models.Staff.staff_id,
+        models.Staff.name,
+        func.coalesce(revenue_sq.c.total, 0),
+        func.coalesce(revenue_sq.c.count, 0),
+        func.coalesce(target_sq.c.target_amount, 0)
+    ).outerjoin(
+        revenue_sq, revenue_sq.c.staff_id == models.Staff.staff_id
+    ).outerjoin(
+        target_sq, target_sq.c.staff_id == models.Staff.staff_id
+    ).filter(models.Staff.is_active == True).all()
+
+
 @router.get("/detail/{staff_id}/{target_date}", response_model=List[schemas.RevenueDetail])
 def get_revenue_detail(
     staff_id: str,
     target_date: date,
-    db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_admin)  # 管理者のみ
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_admin)  # 管理者のみ
 ):
     """売上詳細（管理者のみ）"""
     revenues = db.query(models.Revenue).options(
@@ -95,7 +107,7 @@ def get_revenue_detail(
 def set_staff_target(
     target_data: schemas.StaffTargetCreate,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """売上目標設定（管理者のみ）"""
     existing = db.query(models.StaffTarget).filter(
@@ -119,55 +131,70 @@ def set_staff_target(
     return target
 
 
+def _work_minutes(db: Session, start: date, end: date) -> Dict[str, int]:
+    """
+    期間（半開区間）の担当スタッフ別稼働分数（完了訪問の実績時間、訪問ごとに分未満切り捨て）
+    ロールアップの分数は同行スタッフの売上分も含むため、稼働時間はこちらで集計する
+    """
+    visits = db.query(
+        models.Visit.staff_id,
+        models.Visit.actual_start,
+        models.Visit.actual_end
+    ).filter(
+        date_range_filter(models.Visit.date, start, end),
+        models.Visit.status == models.VisitStatusEnum.completed,
+        models.Visit.staff_id != None,
+        models.Visit.actual_start != None,
+        models.Visit.actual_end != None
+    )
+    minutes: Dict[str, int] = {}
+    for staff_id, actual_start, actual_end in visits:
+        key = str(staff_id)
+        minutes[key] = minutes.get(key, 0) + int((actual_end - actual_start).total_seconds() / 60)
+    return minutes
+
+
 @router.get("/monthly/{target_month}")
 def get_monthly_evaluation(
     target_month: str,  # YYYY-MM
-    db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_admin)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_admin)
 ):
     """月次評価サマリー（管理者のみ）"""
-    staff_list = db.query(models.Staff).filter(models.Staff.is_active == True).all()
-    result = []
+    work_minutes = _work_minutes(db, *month_range(target_month))
 
-    for staff in staff_list:
-        # 月間売上
-        revenues = db.query(models.Revenue).filter(
-            and_(
-                models.Revenue.staff_id == staff.staff_id,
-                func.to_char(models.Revenue.date, 'YYYY-MM') == target_month
-            )
-        ).all()
-
-        monthly_revenue = sum(r.amount for r in revenues)
-        visit_count = len(revenues)
-
-        # 月次目標
-        target = db.query(models.StaffTarget).filter(
-            and_(
-                models.StaffTarget.staff_id == staff.staff_id,
-                models.StaffTarget.target_type == "monthly",
-                models.StaffTarget.target_month == target_month
-            )
-        ).first()
-        target_amount = target.target_amount if target else 0
-        achievement_rate = (monthly_revenue / target_amount * 100) if target_amount > 0 else 0
+    # 月間売上（月次ロールアップ）
+    revenue_sq = db.query(
+        models.StaffRevenueMonthly.staff_id.label("staff_id"),
+        models.StaffRevenueMonthly.amount.label("total"),
+        models.StaffRevenueMonthly.visit_count.label("count")
+    ).filter(
+        models.StaffRevenueMonthly.month == target_month
+    ).subquery()
 
-        # 稼働時間
-        visits = db.query(models.Visit).filter(
-            and_(
-                models.Visit.staff_id == staff.staff_id,
-                func.to_char(models.Visit.date, 'YYYY-MM') == target_month,
-                models.Visit.status == models.VisitStatusEnum.completed
-            )
-        ).all()
-        total_minutes = sum(
-            int((v.actual_end - v.actual_start).total_seconds() / 60)
-            for v in visits if v.actual_start and v.actual_end
-        )
+    # 月次目標
+    target_sq = _target_subquery(db, "monthly", target_month)
+
+    rows = db.query(
+        models.Staff.staff_id,
+        models.Staff.name,
+        func.coalesce(revenue_sq.c.total, 0),
+        func.coalesce(revenue_sq.c.count, 0),
+        func.coalesce(target_sq.c.target_amount, 0)
+    ).outerjoin(
+        revenue_sq, revenue_sq.c.staff_id == models.Staff.staff_id
+    ).outerjoin(
+        target_sq, target_sq.c.staff_id == models.Staff.staff_id
+    ).filter(models.Staff.is_active == True).all()
+
+    result = []
+    for staff_id, staff_name, monthly_revenue, visit_count, target_amount in rows:
+        total_minutes = work_minutes.get(str(staff_id), 0)
+        achievement_rate = (monthly_revenue / target_amount * 100) if target_amount > 0 else 0
 
         result.append({
-            "staff_id": str(staff.staff_id),
-            "staff_name": staff.name,
+            "staff_id": str(staff_id),
+            "staff_name": staff_name,
             "monthly_revenue": monthly_revenue,
             "visit_count": visit_count,
             "total_hours": round(total_minutes / 60, 1),
@@ -181,3 +208,85 @@ def get_monthly_evaluation(
         item["rank"] = i + 1
 
     return result
+
+
+@router.get("/ranking")
+def get_revenue_ranking(
+    from_month: str,  # YYYY-MM
+    to_month: str,  # YYYY-MM（含む）
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """期間売上ランキング（年度累計など・管理者のみ）"""
+    first_day, last_month = parse_month(from_month), parse_month(to_month)
+    from_month, to_month = month_key(first_day), month_key(last_month)
+    if to_month < from_month:
+        raise HTTPException(status_code=400, detail="終了月は開始月以降を指定してください")
+    work_minutes = _work_minutes(db, first_day, next_month(last_month))
+
+    revenue_sq = db.query(
+        models.StaffRevenueMonthly.staff_id.label("staff_id"),
+        func.sum(models.StaffRevenueMonthly.amount).label("total"),
+        func.sum(models.StaffRevenueMonthly.visit_count).label("count")
+    ).filter(
+        and_(
+            models.StaffRevenueMonthly.month >= from_month,
+            models.StaffRevenueMonthly.month <= to_month
+        )
+    ).group_by(models.StaffRevenueMonthly.staff_id).subquery()
+
+    total = func.coalesce(revenue_sq.c.total, 0)
+    rows = db.query(
+        models.Staff.staff_id,
+        models.Staff.name,
+        total,
+        func.coalesce(revenue_sq.c.count, 0)
+    ).outerjoin(
+        revenue_sq, revenue_sq.c.staff_id == models.Staff.staff_id
+    ).filter(models.Staff.is_active == True).order_by(total.desc()).all()
+
+    return [
+        {
+            "rank": i + 1,
+            "staff_id": str(staff_id),
+            "staff_name": staff_name,
+            "revenue": revenue,
+            "visit_count": visit_count,
+            "total_hours": round(work_minutes.get(str(staff_id), 0) / 60, 1)
+        }
+        for i, (staff_id, staff_name, revenue, visit_count) in enumerate(rows)
+    ]
+
+
+@router.post("/recalculate")
+def recalculate_revenues(
+    request: schemas.RevenueRecalculateRequest,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """売上一括再計算（単価変更・計算修正時・管理者のみ）"""
+    if request.end_date < request.start_date:
+        raise HTTPException(status_code=400, detail="終了日は開始日以降を指定してください")
+
+    summary = recalculate_revenue(
+        db,
+        request.start_date,
+        request.end_date,
+        staff_id=str(request.staff_id) if request.staff_id else None,
+        client_id=str(request.client_id) if request.client_id else None,
+        dry_run=request.dry_run
+    )
+    if not request.dry_run:
+        db.commit()
+    return summary
+
+
+def _target_subquery(db: Session, target_type: str, target_month: Optional[str] = None):
+    """スタッフ別の目標額サブクエリ（LEFT JOIN用）"""
+    query = db.query(
+        models.StaffTarget.staff_id.label("staff_id"),
+        func.max(models.StaffTarget.target_amount).label("target_amount")
+    ).filter(models.StaffTarget.target_type == target_type)
+    if target_month is not None:
+        query = query.filter(models.StaffTarget.target_month == target_month)
+    return query.group_by(models.StaffTarget.staff_id).subquery()
@@ -1,33 +1,175 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional
-from datetime import date, datetime
-from app.database import get_db
-from app import models, schemas
-from app.auth import get_current_user, require_coordinator_or_above
+import json
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, func, literal, null
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from app.database import get_async_db, get_async_session_factory, get_db, get_read_db
+from app import models, schemas, serializers
+from app.auth import get_current_user, require_coordinator_or_above, Principal
 from app.optimizer import generate_optimized_routes
+from app.broadcast import broadcaster, progress_channel
+from app.data_version import bump_data_version, date_version_column, get_data_version
+from app.conditional import cached_response, etag_matches, make_etag, not_modified, user_scope
+from app.change_log import record_route_change
+from app.date_filters import date_range_filter
+
+# SSEのキープアライブ間隔（秒）。プロキシのアイドル切断を防ぐ
+PROGRESS_STREAM_HEARTBEAT = 15.0
+
+# ガントチャート用データの最大期間（日）
+GANTT_MAX_DAYS = 31
+
+# ガントチャート用データのコード表（配列の位置がコード値）
+GANTT_SERVICE_TYPES = [s.value for s in models.ServiceTypeEnum]
+GANTT_STATUSES = [s.value for s in models.VisitStatusEnum]
+GANTT_VISIT_TYPES = ["normal", "two_staff"]
 
 router = APIRouter(prefix="/api/v1/routes", tags=["routes"])
 
 
 @router.get("/", response_model=List[schemas.RouteResponse])
-def get_routes(
+async def get_routes(
     target_date: date,
+    request: Request,
     staff_id: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """日次ルート一覧取得"""
-    query = db.query(models.Route).filter(models.Route.date == target_date)
+    etag = make_etag(
+        "routes", user_scope(current_user), request.url.query,
+        await db.run_sync(get_data_version, target_date)
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
     # staffロールは自分のルートのみ
+    criteria = [models.Route.date == target_date]
     if current_user.role == models.RoleEnum.staff:
-        query = query.filter(models.Route.staff_id == current_user.staff_id)
+        criteria.append(models.Route.staff_id == current_user.staff_id)
     elif staff_id:
-        query = query.filter(models.Route.staff_id == staff_id)
+        criteria.append(models.Route.staff_id == staff_id)
+
+    def build(session: Session) -> bytes:
+        # ORMオブジェクトを作らず行タプルから組み立てる（ルートと訪問は別クエリ）
+        routes = serializers.route_rows_query(session).filter(*criteria).all()
+        visits = serializers.visit_rows().query(session).join(
+            models.Route, models.Visit.route_id == models.Route.route_id
+        ).filter(*criteria).order_by(models.Visit.scheduled_start, models.Visit.visit_id).all()
+        return serializers.dumps(serializers.route_list(routes, visits))
 
-    return query.all()
+    return await cached_response(request, target_date.isoformat(), etag, lambda: db.run_sync(build))
+
+
+@router.get("/gantt")
+def get_gantt(
+    target_date: Optional[date] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    ガントチャート用データ（列指向・辞書エンコード）
+    スタッフ・利用者は一覧を1回だけ送り、訪問は項目ごとの配列で返す
+      start / actual_start: start_date 0:00 からの経過分、duration / actual_duration: 分
+      staff / companion / client: staff・clients 配列の位置（なしは -1）
+      service / status / visit_type: 各コード表の位置
+    """
+    if target_date:
+        start_date = end_date = target_date
+    if not (start_date and end_date):
+        raise HTTPException(status_code=400, detail="target_date または start_date・end_date を指定してください")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="終了日は開始日以降を指定してください")
+    if (end_date - start_date).days + 1 > GANTT_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"期間は{GANTT_MAX_DAYS}日以内で指定してください")
+
+    staff = aliased(models.Staff)
+    companion = aliased(models.Staff)
+    query = db.query(
+        models.Visit.visit_id,
+        models.Visit.staff_id,
+        staff.name,
+        models.Visit.companion_staff_id,
+        companion.name,
+        models.Visit.client_id,
+        models.Client.name,
+        models.Visit.scheduled_start,
+        models.Visit.scheduled_end,
+        models.Visit.actual_start,
+        models.Visit.actual_end,
+        models.Visit.service_type,
+        models.Visit.status,
+        models.Visit.visit_type
+    ).outerjoin(
+        staff, staff.staff_id == models.Visit.staff_id
+    ).outerjoin(
+        companion, companion.staff_id == models.Visit.companion_staff_id
+    ).outerjoin(
+        models.Client, models.Client.client_id == models.Visit.client_id
+    ).filter(date_range_filter(models.Visit.date, start_date, end_date + timedelta(days=1)))
+
+    if current_user.role == models.RoleEnum.staff:
+        query = query.filter(models.Visit.staff_id == current_user.staff_id)
+
+    base = datetime.combine(start_date, datetime.min.time())
+    staff_index = {}
+    client_index = {}
+    staff_table = {"staff_id": [], "name": []}
+    client_table = {"client_id": [], "name": []}
+    visits = {
+        "visit_id": [], "start": [], "duration": [], "actual_start": [], "actual_duration": [],
+        "staff": [], "companion": [], "client": [], "service": [], "status": [], "visit_type": [],
+    }
+
+    def encode(index, table, key, entity_id, name):
+        if entity_id is None:
+            return -1
+        entity_id = str(entity_id)
+        if entity_id not in index:
+            index[entity_id] = len(index)
+            table[key].append(entity_id)
+            table["name"].append(name or "")
+        return index[entity_id]
+
+    def minutes(value):
+        return int((value - base).total_seconds() // 60)
+
+    def code(table, value):
+        return table.index(value) if value in table else -1
+
+    for (visit_id, staff_id, staff_name, companion_id, companion_name, client_id, client_name,
+         start, end, actual_start, actual_end, service_type, visit_status, visit_type) in query.order_by(
+            models.Visit.staff_id, models.Visit.scheduled_start, models.Visit.visit_id):
+        visits["visit_id"].append(str(visit_id))
+        visits["start"].append(minutes(start))
+        visits["duration"].append(minutes(end) - minutes(start))
+        has_actual = actual_start is not None and actual_end is not None
+        visits["actual_start"].append(minutes(actual_start) if has_actual else None)
+        visits["actual_duration"].append(minutes(actual_end) - minutes(actual_start) if has_actual else None)
+        visits["staff"].append(encode(staff_index, staff_table, "staff_id", staff_id, staff_name))
+        visits["companion"].append(encode(staff_index, staff_table, "staff_id", companion_id, companion_name))
+        visits["client"].append(encode(client_index, client_table, "client_id", client_id, client_name))
+        visits["service"].append(code(GANTT_SERVICE_TYPES, service_type))
+        visits["status"].append(code(GANTT_STATUSES, visit_status))
+        visits["visit_type"].append(code(GANTT_VISIT_TYPES, visit_type))
+
+    payload = {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "base": base.isoformat(),
+        "service_types": GANTT_SERVICE_TYPES,
+        "statuses": GANTT_STATUSES,
+        "visit_types": GANTT_VISIT_TYPES,
+        "staff": staff_table,
+        "clients": client_table,
+        "visits": visits,
+    }
+    return Response(content=serializers.dumps(payload), media_type="application/json")
 
 
 @router.post("/generate", status_code=status.HTTP_202_ACCEPTED)
@@ -35,7 +177,7 @@ def generate_routes(
     request: schemas.RouteGenerateRequest,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_coordinator_or_above)
+    current_user: Principal = Depends(require_coordinator_or_above)
 ):
     """AIルート自動生成（非同期）"""
     background_tasks.add_task(
@@ -51,7 +193,7 @@ def generate_routes(
 def create_route(
     route_data: schemas.RouteCreate,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_coordinator_or_above)
+    current_user: Principal = Depends(require_coordinator_or_above)
 ):
     """ルート手動作成"""
     route = models.Route(
@@ -60,6 +202,8 @@ def create_route(
         generated_by="manual"
     )
     db.add(route)
+    record_route_change(db, route)
+    bump_data_version(db, route_data.date)
     db.commit()
     db.refresh(route)
     return route
@@ -70,46 +214,58 @@ def update_route_status(
     route_id: str,
     new_status: str,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_coordinator_or_above)
+    current_user: Principal = Depends(require_coordinator_or_above)
 ):
     """ルートステータス更新"""
     route = db.query(models.Route).filter(models.Route.route_id == route_id).first()
     if not route:
         raise HTTPException(status_code=404, detail="ルートが見つかりません")
     route.status = new_status
+    record_route_change(db, route)
+    bump_data_version(db, route.date)
     db.commit()
     return {"message": "ステータスを更新しました"}
 
 
-@router.get("/progress/{target_date}", response_model=schemas.ProgressResponse)
-def get_progress(
-    target_date: date,
-    db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(get_current_user)
-):
-    """日次進捗率取得"""
-    query = db.query(models.Visit).filter(models.Visit.date == target_date)
+def _progress_snapshot(session: Session, target_date: date, own_staff_id: Optional[str]) -> Tuple[bytes, int]:
+    """
+    日次進捗（ProgressResponse のJSON）と、その集計時点の日付側データバージョン
+    own_staff_id 指定時はその担当分のみ
+    バージョンは集計と同じ1文で読む（訪問がない日も返るよう、件数0の行を UNION ALL で足す）
+    """
+    version = date_version_column(target_date)
+    query = session.query(
+        models.Visit.staff_id,
+        models.Staff.name,
+        models.Visit.status,
+        func.count(models.Visit.visit_id),
+        version
+    ).outerjoin(
+        models.Staff, models.Staff.staff_id == models.Visit.staff_id
+    ).filter(models.Visit.date == target_date)
 
-    if current_user.role == models.RoleEnum.staff:
-        query = query.filter(models.Visit.staff_id == current_user.staff_id)
+    if own_staff_id:
+        query = query.filter(models.Visit.staff_id == own_staff_id)
+
+    query = query.group_by(models.Visit.staff_id, models.Staff.name, models.Visit.status)
+    rows = query.union_all(session.query(null(), null(), null(), literal(0), version)).all()
+    data_version = rows[0][4]
+    rows = [row[:4] for row in rows]
 
-    visits = query.all()
-    total = len(visits)
-    completed = sum(1 for v in visits if v.status == models.VisitStatusEnum.completed)
-    cancelled = sum(1 for v in visits if v.status == models.VisitStatusEnum.cancelled)
+    total = sum(count for _, _, _, count in rows)
+    completed = sum(count for _, _, st, count in rows if st == models.VisitStatusEnum.completed)
+    cancelled = sum(count for _, _, st, count in rows if st == models.VisitStatusEnum.cancelled)
 
     # スタッフ別進捗
     staff_progress = {}
-    for v in visits:
-        if v.staff_id:
-            sid = str(v.staff_id)
+    for sid, staff_name, st, count in rows:
+        if sid:
+            sid = str(sid)
             if sid not in staff_progress:
-                staff_progress[sid] = {"total": 0, "completed": 0, "staff_name": ""}
-                if v.staff:
-                    staff_progress[sid]["staff_name"] = v.staff.name
-            staff_progress[sid]["total"] += 1
-            if v.status == models.VisitStatusEnum.completed:
-                staff_progress[sid]["completed"] += 1
+                staff_progress[sid] = {"total": 0, "completed": 0, "staff_name": staff_name or ""}
+            staff_progress[sid]["total"] += count
+            if st == models.VisitStatusEnum.completed:
+                staff_progress[sid]["completed"] += count
 
     staff_progress_list = [
         {
@@ -129,4 +285,73 @@ def get_progress(
         cancelled_visits=cancelled,
         progress_rate=round(completed / total * 100, 1) if total > 0 else 0,
         staff_progress=staff_progress_list
+    ).model_dump_json().encode(), data_version
+
+
+def _own_staff_id(current_user: Principal) -> Optional[str]:
+    return str(current_user.staff_id) if current_user.role == models.RoleEnum.staff else None
+
+
+@router.get("/progress/{target_date}", response_model=schemas.ProgressResponse)
+async def get_progress(
+    target_date: date,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """日次進捗率取得（スタッフ×ステータスの集計1クエリ）"""
+    etag = make_etag(
+        "progress", user_scope(current_user), target_date.isoformat(),
+        await db.run_sync(get_data_version, target_date)
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    own_staff_id = _own_staff_id(current_user)
+    return await cached_response(
+        request, target_date.isoformat(), etag,
+        lambda: db.run_sync(lambda session: _progress_snapshot(session, target_date, own_staff_id)[0])
+    )
+
+
+@router.get("/progress/{target_date}/stream")
+async def stream_progress(
+    target_date: date,
+    request: Request,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    日次進捗の差分をServer-Sent Eventsでプッシュ配信
+    接続（再接続）のたびに最初に progress イベントで現在の進捗全体を送り、以降は progress_delta イベントを送る
+    購読を始めてから全体を取得するため、初期値と差分の間で変更を取りこぼさない。
+    全体に含まれる変更（差分のデータバージョンが全体の取得時点以下）の差分は送らない
+    """
+    own_staff_id = _own_staff_id(current_user)
+    subscription = broadcaster.subscribe(progress_channel(target_date))
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            async with get_async_session_factory()() as session:
+                snapshot, snapshot_version = await session.run_sync(_progress_snapshot, target_date, own_staff_id)
+            yield f"event: progress\ndata: {snapshot.decode()}\n\n"
+            while not await request.is_disconnected():
+                message = await subscription.get(timeout=PROGRESS_STREAM_HEARTBEAT)
+                if message is None:
+                    yield ": ping\n\n"
+                    continue
+                delta = json.loads(message)
+                if delta.get("version") is not None and delta["version"] <= snapshot_version:
+                    continue
+                # staffロールは自分の訪問の差分のみ
+                if own_staff_id and delta.get("staff_id") != own_staff_id:
+                    continue
+                yield f"event: progress_delta\ndata: {message}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
@@ -1,17 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app import models, schemas
-from app.auth import get_password_hash, require_admin, get_current_user
+from app.data_version import bump_master_version
+from app.password_hashing import hash_password_blocking
+from app.auth import require_admin, get_current_user, Principal, principal_cache
 
 router = APIRouter(prefix="/api/v1/staff", tags=["staff"])
 
 
 @router.get("/", response_model=List[schemas.StaffResponse])
 def get_staff_list(
-    db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """スタッフ一覧取得（全ロール閲覧可）"""
     return db.query(models.Staff).filter(models.Staff.is_active == True).all()
@@ -20,8 +22,8 @@ def get_staff_list(
 @router.get("/{staff_id}", response_model=schemas.StaffResponse)
 def get_staff(
     staff_id: str,
-    db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     staff = db.query(models.Staff).filter(models.Staff.staff_id == staff_id).first()
     if not staff:
@@ -33,7 +35,7 @@ def get_staff(
 def create_staff(
     staff_data: schemas.StaffCreate,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """スタッフ登録（管理者のみ）"""
     existing = db.query(models.Staff).filter(models.Staff.email == staff_data.email).first()
@@ -43,7 +45,7 @@ def create_staff(
     staff = models.Staff(
         name=staff_data.name,
         email=staff_data.email,
-        hashed_password=get_password_hash(staff_data.password),
+        hashed_password=hash_password_blocking(staff_data.password),
         role=staff_data.role,
         skill_types=staff_data.skill_types,
         max_hours_day=staff_data.max_hours_day,
@@ -51,6 +53,7 @@ def create_staff(
         home_address=staff_data.home_address,
     )
     db.add(staff)
+    bump_master_version(db)
     db.commit()
     db.refresh(staff)
     return staff
@@ -61,7 +64,7 @@ def update_staff(
     staff_id: str,
     staff_data: schemas.StaffUpdate,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """スタッフ更新（管理者のみ）"""
     staff = db.query(models.Staff).filter(models.Staff.staff_id == staff_id).first()
@@ -71,7 +74,9 @@ def update_staff(
     for key, value in staff_data.model_dump(exclude_unset=True).items():
         setattr(staff, key, value)
 
+    bump_master_version(db)
     db.commit()
+    principal_cache.invalidate(str(staff_id))
     db.refresh(staff)
     return staff
 
@@ -80,11 +85,13 @@ def update_staff(
 def delete_staff(
     staff_id: str,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """スタッフ削除（論理削除・管理者のみ）"""
     staff = db.query(models.Staff).filter(models.Staff.staff_id == staff_id).first()
     if not staff:
         raise HTTPException(status_code=404, detail="スタッフが見つかりません")
     staff.is_active = False
+    bump_master_version(db)
     db.commit()
+    principal_cache.invalidate(str(staff_id))
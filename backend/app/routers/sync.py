@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import or_
+from typing import Optional
+from datetime import datetime, timedelta
+from app.database import get_read_db
+from app import models, schemas
+from app.auth import get_current_user, Principal
+from app.change_log import DELETE, latest_change_id
+from app.pagination import decode_cursor, encode_cursor
+
+router = APIRouter(prefix="/api/v1/sync", tags=["sync"])
+
+# 直近に書き込まれた変更は次回に回す（採番順とcommit順の入れ替わりで取りこぼさないため）
+SYNC_SETTLE_SECONDS = 2
+
+MAX_SYNC_CHANGES = 1000
+
+
+@router.get("/", response_model=schemas.SyncResponse)
+def sync_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=MAX_SYNC_CHANGES),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    差分同期（cursor 以降に変更された訪問・ルートの現在値と削除ID）
+    since 未指定時は現在のカーソルのみ返す。初回は先にカーソルを取得してから一覧をダウンロードする
+    staffロールは自分の担当分のみ（担当から外れた訪問は削除として返す）
+    """
+    if not since:
+        return schemas.SyncResponse(cursor=encode_cursor(latest_change_id(db)), has_more=False)
+
+    (last_id,) = decode_cursor(since, 1)
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="カーソルが不正です")
+    own_staff_id = str(current_user.staff_id) if current_user.role == models.RoleEnum.staff else None
+
+    query = db.query(models.VisitChange).filter(models.VisitChange.change_id > last_id)
+    if own_staff_id:
+        query = query.filter(or_(
+            models.VisitChange.staff_id == own_staff_id,
+            models.VisitChange.old_staff_id == own_staff_id
+        ))
+    changes = query.order_by(models.VisitChange.change_id).limit(limit + 1).all()
+
+    has_more = len(changes) > limit
+    horizon = datetime.utcnow() - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    latest = {}
+    for change in changes[:limit]:
+        if change.changed_at and change.changed_at > horizon:
+            has_more = True
+            break
+        latest[(change.entity, change.entity_id)] = change.operation
+        last_id = change.change_id
+
+    visit_ids = [entity_id for (entity, entity_id), op in latest.items() if entity == "visit" and op != DELETE]
+    route_ids = [entity_id for (entity, entity_id), op in latest.items() if entity == "route" and op != DELETE]
+    deleted_visit_ids = {entity_id for (entity, entity_id), op in latest.items() if entity == "visit" and op == DELETE}
+    deleted_route_ids = {entity_id for (entity, entity_id), op in latest.items() if entity == "route" and op == DELETE}
+
+    visits = db.query(models.Visit).options(
+        joinedload(models.Visit.client),
+        joinedload(models.Visit.staff),
+        joinedload(models.Visit.companion_staff)
+    ).filter(models.Visit.visit_id.in_(visit_ids)).all() if visit_ids else []
+    routes = db.query(models.Route).filter(models.Route.route_id.in_(route_ids)).all() if route_ids else []
+
+    # 記録後に削除された行・担当から外れた行は削除扱い
+    found_visits = {str(v.visit_id) for v in visits}
+    deleted_visit_ids.update(set(visit_ids) - found_visits)
+    deleted_route_ids.update(set(route_ids) - {str(r.route_id) for r in routes})
+    if own_staff_id:
+        deleted_visit_ids.update(str(v.visit_id) for v in visits if str(v.staff_id) != own_staff_id)
+        visits = [v for v in visits if str(v.staff_id) == own_staff_id]
+        routes = [r for r in routes if str(r.staff_id) == own_staff_id]
+
+    return schemas.SyncResponse(
+        cursor=encode_cursor(last_id),
+        has_more=has_more,
+        visits=visits,
+        deleted_visit_ids=sorted(deleted_visit_ids),
+        routes=routes,
+        deleted_route_ids=sorted(deleted_route_ids),
+    )
@@ -1,46 +1,186 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import and_
 from typing import List, Optional
-from datetime import date, datetime
-from app.database import get_db
-from app import models, schemas
-from app.auth import get_current_user, require_coordinator_or_above
+from datetime import date, datetime, timedelta
+from app.database import ReadSessionLocal, get_async_db, get_db
+from app import models, schemas, serializers
+from app.auth import get_current_user, require_coordinator_or_above, Principal
+from app.broadcast import publish_progress_delta
+from app.revenue_rollup import apply_revenue_delta
+from app.revenue_batch import DEFAULT_UNIT_PRICE, compute_revenue
+from app.data_version import bump_data_version, get_date_version, get_range_version
+from app.conditional import CACHE_CONTROL, cached_response, etag_matches, make_etag, not_modified, set_etag, user_scope
+from app.change_log import record_route_change, record_visit_change
+from app.date_filters import date_range_filter
+from app.pagination import NEXT_CURSOR_HEADER, after_datetime_key, encode_cursor
+from app.serializers import VISIT_FIELDS
 
 router = APIRouter(prefix="/api/v1/visits", tags=["visits"])
 
 
+MAX_PAGE_SIZE = 1000
+
+# NDJSONモードで取得するチャンクの行数
+STREAM_CHUNK_SIZE = 500
+
+
 @router.get("/", response_model=List[schemas.VisitResponse])
-def get_visits(
-    target_date: date,
+async def get_visits(
+    request: Request,
+    target_date: Optional[date] = None,
     staff_id: Optional[str] = None,
     unassigned: Optional[bool] = False,
-    db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(get_current_user)
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """訪問一覧取得"""
-    query = db.query(models.Visit).options(
-        joinedload(models.Visit.client),
-        joinedload(models.Visit.staff),
-        joinedload(models.Visit.companion_staff)
-    ).filter(models.Visit.date == target_date)
+    """
+    訪問一覧取得
+    target_date のみ指定した場合は従来どおり当日分を全件返す
+    start_date〜end_date（両端含む）で期間指定、limit / cursor で (開始予定時刻, 訪問ID) 順のページング
+    （続きがある場合は X-Next-Cursor ヘッダーに次のカーソル）、fields で返す項目を絞り込み、
+    format=ndjson で1行1訪問のストリーミング（limit で打ち切った場合は最終行が {"next_cursor": ...}）
+    データが変わっていなければ If-None-Match に対して 304 を返す（当日分の一覧はレスポンスキャッシュ経由）
+    読み取りは非同期セッションで行う（クエリ組み立ては同期セッションと共通のため run_sync 経由）
+    本文はORMを介さず行タプルから組み立てる（app.serializers）
+    """
+    if target_date:
+        start_date = end_date = target_date
+    if not (start_date and end_date):
+        raise HTTPException(status_code=400, detail="target_date または start_date・end_date を指定してください")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="終了日は開始日以降を指定してください")
+
+    etag = make_etag(
+        "visits", user_scope(current_user), request.url.query,
+        await db.run_sync(get_range_version, start_date, end_date)
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    if current_user.role == models.RoleEnum.staff:
-        query = query.filter(models.Visit.staff_id == current_user.staff_id)
-    elif staff_id:
-        query = query.filter(models.Visit.staff_id == staff_id)
+    selected = _parse_fields(fields)
+    legacy = target_date and not (cursor or limit or fields) and format == "json"
+    own_staff_id = current_user.staff_id if current_user.role == models.RoleEnum.staff else None
+
+    rows = serializers.visit_rows(tuple(selected))
+
+    def build_query(session: Session):
+        query = rows.query(session).filter(date_range_filter(models.Visit.date, start_date, end_date + timedelta(days=1)))
+
+        if own_staff_id:
+            query = query.filter(models.Visit.staff_id == own_staff_id)
+        elif staff_id:
+            query = query.filter(models.Visit.staff_id == staff_id)
 
-    if unassigned:
-        query = query.filter(models.Visit.staff_id == None)
+        if unassigned:
+            query = query.filter(models.Visit.staff_id == None)
 
-    return query.order_by(models.Visit.scheduled_start).all()
+        if cursor:
+            query = query.filter(after_datetime_key(models.Visit.scheduled_start, models.Visit.visit_id, cursor))
+
+        return query.order_by(models.Visit.scheduled_start, models.Visit.visit_id)
+
+    if legacy:
+        return await cached_response(
+            request, target_date.isoformat(), etag,
+            lambda: db.run_sync(lambda session: serializers.dumps([rows.to_dict(r) for r in build_query(session).all()]))
+        )
+
+    if format == "ndjson":
+        # 本体の送信はリクエストのセッション終了後になるため専用セッション（同期）で読む
+        if cursor:
+            after_datetime_key(models.Visit.scheduled_start, models.Visit.visit_id, cursor)  # 不正なカーソルはここで400にする
+        streaming = StreamingResponse(
+            _stream_visits_ndjson(build_query, rows, limit),
+            media_type="application/x-ndjson"
+        )
+        set_etag(streaming, etag)
+        return streaming
+
+    def load(session: Session):
+        query = build_query(session)
+        visits = query.limit(limit + 1).all() if limit else query.all()
+        next_cursor = None
+        if limit and len(visits) > limit:
+            visits = visits[:limit]
+            next_cursor = encode_cursor(*rows.cursor_key(visits[-1]))
+        return serializers.dumps([rows.to_dict(v) for v in visits]), next_cursor
+
+    body, next_cursor = await db.run_sync(load)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(VISIT_FIELDS)
+    selected = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in VISIT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"指定できない項目です: {', '.join(unknown)}")
+    return selected
+
+
+def _stream_visits_ndjson(build_query, rows: serializers.VisitRows, limit: Optional[int]):
+    db = ReadSessionLocal()
+    try:
+        query = build_query(db)
+        if limit:
+            query = query.limit(limit + 1)
+        sent = 0
+        last = None
+        lines = []
+        for row in query.yield_per(STREAM_CHUNK_SIZE):
+            if limit and sent == limit:
+                lines.append(serializers.dumps({"next_cursor": encode_cursor(*rows.cursor_key(last))}))
+                break
+            lines.append(serializers.dumps(rows.to_dict(row)))
+            last = row
+            sent += 1
+            if len(lines) >= STREAM_CHUNK_SIZE:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+    finally:
+        db.close()
+
+
+@router.get("/{visit_id}", response_model=schemas.VisitResponse)
+async def get_visit(
+    visit_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """訪問1件取得（ガントチャートの列指向データにない住所・メモを詳細表示で使う）"""
+    rows = serializers.visit_rows()
+    row = await db.run_sync(
+        lambda session: rows.query(session).filter(models.Visit.visit_id == visit_id).first()
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="訪問が見つかりません")
+    visit = rows.to_dict(row)
+    if current_user.role == models.RoleEnum.staff and str(visit["staff_id"]) != str(current_user.staff_id):
+        raise HTTPException(status_code=403, detail="自分の担当訪問のみ参照できます")
+    return Response(content=serializers.dumps(visit), media_type="application/json")
 
 
 @router.post("/", response_model=schemas.VisitResponse, status_code=status.HTTP_201_CREATED)
 def create_visit(
     visit_data: schemas.VisitCreate,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_coordinator_or_above)
+    current_user: Principal = Depends(require_coordinator_or_above)
 ):
     """訪問追加"""
     # ダブルブッキングチェック
@@ -62,6 +202,9 @@ def create_visit(
 
     visit = models.Visit(**visit_data.model_dump())
     db.add(visit)
+    record_visit_change(db, visit)
+    bump_data_version(db, visit_data.date)
+    version = get_date_version(db, visit_data.date)
     db.commit()
     db.refresh(visit)
 
@@ -69,6 +212,8 @@ def create_visit(
     if visit.route_id:
         _update_route_total_hours(db, str(visit.route_id))
 
+    _publish_visit_change(db, visit, None, None, version)
+
     return db.query(models.Visit).options(
         joinedload(models.Visit.client),
         joinedload(models.Visit.staff),
@@ -81,7 +226,7 @@ def update_visit(
     visit_id: str,
     visit_data: schemas.VisitUpdate,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """訪問更新（実績入力含む）"""
     visit = db.query(models.Visit).filter(models.Visit.visit_id == visit_id).first()
@@ -117,6 +262,7 @@ def update_visit(
         if overlap:
             raise HTTPException(status_code=400, detail="ダブルブッキングが発生します")
 
+    before = (visit.staff_id, visit.status)
     for key, value in update_data.items():
         setattr(visit, key, value)
 
@@ -124,12 +270,17 @@ def update_visit(
     if visit_data.status == models.VisitStatusEnum.completed and visit.staff_id:
         _calculate_revenue(db, visit)
 
+    record_visit_change(db, visit, old_staff_id=before[0])
+    bump_data_version(db, visit.date)
+    version = get_date_version(db, visit.date)
     db.commit()
     db.refresh(visit)
 
     if visit.route_id:
         _update_route_total_hours(db, str(visit.route_id))
 
+    _publish_visit_change(db, visit, *before, version)
+
     return db.query(models.Visit).options(
         joinedload(models.Visit.client),
         joinedload(models.Visit.staff),
@@ -141,14 +292,35 @@ def update_visit(
 def delete_visit(
     visit_id: str,
     db: Session = Depends(get_db),
-    current_user: models.Staff = Depends(require_coordinator_or_above)
+    current_user: Principal = Depends(require_coordinator_or_above)
 ):
     visit = db.query(models.Visit).filter(models.Visit.visit_id == visit_id).first()
     if not visit:
         raise HTTPException(status_code=404, detail="訪問が見つかりません")
+    visit_date, staff_id, old_status = visit.date, visit.staff_id, visit.status
+    record_visit_change(db, visit, deleted=True)
     db.delete(visit)
+    bump_data_version(db, visit_date)
+    version = get_date_version(db, visit_date)
     db.commit()
 
+    publish_progress_delta(visit_date, visit_id, staff_id, old_status, None, version=version)
+
+
+def _publish_visit_change(db: Session, visit: models.Visit, old_staff_id, old_status, version: int):
+    """進捗に影響する変更（ステータス・担当スタッフ）をSSE購読者へ配信"""
+    old_staff_id = str(old_staff_id) if old_staff_id else None
+    new_staff_id = str(visit.staff_id) if visit.staff_id else None
+    if old_staff_id != new_staff_id and old_status is not None:
+        # 担当替え：旧担当から外し、新担当へ追加
+        publish_progress_delta(visit.date, visit.visit_id, old_staff_id, old_status, None, version=version)
+        old_status = None
+
+    staff_name = None
+    if new_staff_id and old_status is None:
+        staff_name = db.query(models.Staff.name).filter(models.Staff.staff_id == new_staff_id).scalar()
+    publish_progress_delta(visit.date, visit.visit_id, new_staff_id, old_status, visit.status, staff_name, version)
+
 
 def _update_route_total_hours(db: Session, route_id: str):
     """ルートの合計稼働時間を再計算"""
@@ -165,6 +337,8 @@ def _update_route_total_hours(db: Session, route_id: str):
     route = db.query(models.Route).filter(models.Route.route_id == route_id).first()
     if route:
         route.total_hours = round(total_minutes / 60, 2)
+        record_route_change(db, route)
+        bump_data_version(db, route.date)
         db.commit()
 
 
@@ -173,23 +347,28 @@ def _calculate_revenue(db: Session, visit: models.Visit):
     if not visit.actual_start or not visit.actual_end:
         return
 
-    duration_minutes = int((visit.actual_end - visit.actual_start).total_seconds() / 60)
-
     # サービス単価をケアプランから取得（なければデフォルト）
-    unit_price = 2500
+    unit_price = DEFAULT_UNIT_PRICE
     if visit.plan_id:
         plan = db.query(models.ServicePlan).filter(models.ServicePlan.plan_id == visit.plan_id).first()
         if plan:
             unit_price = plan.unit_price
 
-    amount = int(duration_minutes / 60 * unit_price)
+    duration_minutes, amount = compute_revenue(visit.actual_start, visit.actual_end, unit_price)
 
     # 既存売上レコードを更新 or 新規作成
-    existing = db.query(models.Revenue).filter(models.Revenue.visit_id == visit.visit_id).first()
+    existing_query = db.query(models.Revenue).filter(models.Revenue.visit_id == visit.visit_id)
+    if visit.companion_staff_id:
+        existing_query = existing_query.filter(models.Revenue.staff_id != visit.companion_staff_id)
+    existing = existing_query.first()
     if existing:
+        apply_revenue_delta(
+            db, existing.staff_id, existing.date,
+            amount - existing.amount, 0, duration_minutes - existing.duration_minutes
+        )
         existing.amount = amount
         existing.duration_minutes = duration_minutes
-        existing.unit_price = unit_price
+        existing.service_unit_price = unit_price
     else:
         revenue = models.Revenue(
             visit_id=visit.visit_id,
@@ -200,6 +379,7 @@ def _calculate_revenue(db: Session, visit: models.Visit):
             date=visit.date
         )
         db.add(revenue)
+        apply_revenue_delta(db, visit.staff_id, visit.date, amount, 1, duration_minutes)
 
     # 2人体制の場合、同行スタッフにも売上計上
     if visit.companion_staff_id and visit.visit_type == "two_staff":
@@ -219,3 +399,4 @@ def _calculate_revenue(db: Session, visit: models.Visit):
                 date=visit.date
             )
             db.add(companion_revenue)
+            apply_revenue_delta(db, visit.companion_staff_id, visit.date, amount, 1, duration_minutes)
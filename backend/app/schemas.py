@@ -206,6 +206,28 @@ class RouteResponse(BaseModel):
         from_attributes = True
 
 
+# ===== 差分同期スキーマ =====
+class RouteSyncItem(BaseModel):
+    route_id: UUID
+    date: date
+    staff_id: UUID
+    status: str
+    total_hours: float
+    generated_by: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+
+class SyncResponse(BaseModel):
+    cursor: str
+    has_more: bool
+    visits: List[VisitResponse] = []
+    deleted_visit_ids: List[str] = []
+    routes: List[RouteSyncItem] = []
+    deleted_route_ids: List[str] = []
+
+
 # ===== 売上スキーマ =====
 class RevenueSummary(BaseModel):
     staff_id: UUID
@@ -230,6 +252,22 @@ class RevenueDetail(BaseModel):
         from_attributes = True
 
 
+class RevenueRecalculateRequest(BaseModel):
+    start_date: date
+    end_date: date
+    staff_id: Optional[UUID] = None
+    client_id: Optional[UUID] = None
+    dry_run: bool = False
+
+
+# ===== レポートスキーマ =====
+class RouteExcelRangeRequest(BaseModel):
+    start_date: date
+    end_date: date
+    # xlsx: 1日1シートの1ブック / zip: 日別ブックのzip
+    format: str = Field("xlsx", pattern="^(xlsx|zip)$")
+
+
 # ===== 目標スキーマ =====
 class StaffTargetCreate(BaseModel):
     staff_id: UUID
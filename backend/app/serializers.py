@@ -0,0 +1,116 @@
+"""
+大きな一覧レスポンス（訪問一覧・ルート一覧）の高速シリアライズ
+
+- ORMオブジェクトを作らず、返す項目の列だけを行タプルで取得して dict に詰め、orjson でエンコードする
+- DBから読んだ値は型が決まっているため、pydantic の from_attributes 検証（全件の再検証）は行わない
+- 出力は schemas.VisitResponse / schemas.RouteResponse の dump_json と同じ（項目・順序・値の表現）
+- 列リストと行→dict の変換は fields の組み合わせごとに1回だけ組み立てて使い回す
+"""
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import orjson
+from sqlalchemy.orm import Query, Session, aliased
+from app import models, schemas
+
+CompanionStaff = aliased(models.Staff, name="companion_staff")
+
+# VisitResponse の入れ子項目: (結合先, 結合に使う関連, スキーマ)
+NESTED_VISIT_FIELDS = {
+    "client": (models.Client, models.Visit.client, schemas.ClientSummary),
+    "staff": (models.Staff, models.Visit.staff, schemas.StaffSummary),
+    "companion_staff": (CompanionStaff, models.Visit.companion_staff, schemas.StaffSummary),
+}
+
+# fields で指定できる項目（VisitResponse と同じ）
+VISIT_FIELDS = tuple(schemas.VisitResponse.model_fields)
+
+ROUTE_FIELDS = tuple(name for name in schemas.RouteResponse.model_fields if name not in ("visits", "staff"))
+STAFF_SUMMARY_FIELDS = tuple(schemas.StaffSummary.model_fields)
+
+
+def dumps(data) -> bytes:
+    """pydantic の dump_json と同じ表現（UTF-8のまま・datetime は ISO 8601）"""
+    return orjson.dumps(data)
+
+
+def _nested(names: Tuple[str, ...], values: tuple):
+    # 外部結合で相手がいない場合は主キーが NULL
+    return dict(zip(names, values)) if values[0] is not None else None
+
+
+class VisitRows:
+    """
+    VisitResponse（または fields で絞った項目）を行タプルから組み立てる
+
+    行の先頭2列は常に (scheduled_start, visit_id)（ページングのカーソル用）
+    """
+
+    def __init__(self, selected: Tuple[str, ...]):
+        columns = [models.Visit.scheduled_start, models.Visit.visit_id]
+        layout = []
+        joins = []
+        for name in selected:
+            if name in NESTED_VISIT_FIELDS:
+                entity, relationship, schema = NESTED_VISIT_FIELDS[name]
+                nested_names = tuple(schema.model_fields)
+                start = len(columns)
+                columns.extend(getattr(entity, n) for n in nested_names)
+                layout.append((name, start, len(columns), nested_names))
+                joins.append((entity, relationship))
+            else:
+                layout.append((name, len(columns), None, None))
+                columns.append(getattr(models.Visit, name))
+        self.columns = columns
+        self._layout = layout
+        self._joins = joins
+
+    def query(self, session: Session) -> Query:
+        """models.Visit を起点にした行タプルのクエリ（絞り込み・並び順は呼び出し側で付ける）"""
+        query = session.query(*self.columns).select_from(models.Visit)
+        for entity, relationship in self._joins:
+            query = query.outerjoin(entity, relationship)
+        return query
+
+    def to_dict(self, row) -> dict:
+        data = {}
+        for name, start, stop, nested_names in self._layout:
+            data[name] = row[start] if stop is None else _nested(nested_names, row[start:stop])
+        return data
+
+    @staticmethod
+    def cursor_key(row) -> Tuple:
+        return row[0], str(row[1])
+
+
+@lru_cache(maxsize=64)
+def visit_rows(selected: Tuple[str, ...] = VISIT_FIELDS) -> VisitRows:
+    return VisitRows(selected)
+
+
+def route_rows_query(session: Session) -> Query:
+    """RouteResponse の visits 以外（担当スタッフ含む）の行タプルクエリ"""
+    return session.query(
+        *[getattr(models.Route, name) for name in ROUTE_FIELDS],
+        *[getattr(models.Staff, name) for name in STAFF_SUMMARY_FIELDS],
+    ).select_from(models.Route).outerjoin(models.Staff, models.Route.staff)
+
+
+def route_list(route_rows: List[tuple], visit_rows_: List[tuple]) -> List[dict]:
+    """
+    List[RouteResponse] と同じ構造を組み立てる
+    visit_rows_ は visit_rows() の全項目で、ルート内の並び順（開始予定時刻順）に並んでいること
+    """
+    serializer = visit_rows()
+    visits_by_route: Dict[str, List[dict]] = {}
+    for row in visit_rows_:
+        visit = serializer.to_dict(row)
+        visits_by_route.setdefault(visit["route_id"], []).append(visit)
+
+    split = len(ROUTE_FIELDS)
+    routes = []
+    for row in route_rows:
+        route = dict(zip(ROUTE_FIELDS, row[:split]))
+        route["visits"] = visits_by_route.get(route["route_id"], [])
+        route["staff"] = _nested(STAFF_SUMMARY_FIELDS, row[split:])
+        routes.append(route)
+    return routes
@@ -0,0 +1,460 @@
+"""
+運用コマンド
+実行: python manage.py <command> [options]
+
+  migrate [--revision REV]
+      マイグレーションを適用してスキーマを作成・更新（create_all で作成済みのDBは初回に 0001 として記録）
+
+  check-startup [--budget-ms MS] [--top N]
+      app.main の import 時間を計測し、予算超過や重い任意依存の読み込みがあれば失敗
+
+  rebuild-rollups [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+      売上ロールアップ（staff_revenue_daily / staff_revenue_monthly）を revenues から再構築
+
+  recalculate-revenue --start YYYY-MM-DD --end YYYY-MM-DD [--staff-id ID] [--client-id ID] [--dry-run]
+      完了訪問の売上を一括再計算（単価変更・計算ロジック修正時）
+
+  import-routes FILE [FILE ...] [--year YYYY] [--completed] [--dry-run]
+      過去のルート表Excelから訪問を一括取込（ファイルごとにcommit）
+
+  bench-login --email EMAIL --password PASSWORD [--url URL] [--logins N] [--probe PATH]
+      起動中のAPIにログインを同時にN件送り、その間の他エンドポイントの応答時間を平常時と比較
+
+  bench-reads --email EMAIL --password PASSWORD [--clients N] [--duration SEC] [--date YYYY-MM-DD] [--path PATH ...] [--min-ratio R]
+      レスポンスキャッシュ無効・有効のサーバーを順に起動してN並列で読み取りリクエストを送り、
+      スループットと応答時間を比較（キャッシュありが無効時の R 倍未満なら失敗）
+
+  bench-compression [--date YYYY-MM-DD] [--sizes N ...] [--repeat N] [--xlsx]
+      訪問一覧JSON（件数別）を gzip / brotli の各レベルで圧縮し、送信バイト数と1応答あたりのCPU時間を計測
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+from datetime import date
+from app.database import SessionLocal
+
+
+BASELINE_REVISION = "0001"
+# 起動時に読み込まない依存（初回利用時に読み込む）
+LAZY_MODULES = ("openpyxl", "numpy", "pandas", "ortools", "pyarrow")
+# app.main の import に許容する時間（ミリ秒）
+STARTUP_BUDGET_MS = 2000
+# bench-reads: キャッシュありのスループットがキャッシュなしの何倍以上あれば合格とするか
+BENCH_READS_MIN_RATIO = 1.2
+
+
+def upgrade_schema(revision: str = "head") -> bool:
+    """
+    マイグレーションを revision まで適用（migrate コマンド・サーバーレスのエントリポイント api/index.py から使う）
+    以前 import 時の create_all で作成されたDBは、初期スキーマを適用済みとして記録してから適用する（記録した場合 True）
+    """
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import inspect
+    from app.database import engine
+
+    cfg = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    tables = set(inspect(engine).get_table_names())
+    stamped = "alembic_version" not in tables and "staff" in tables
+    if stamped:
+        command.stamp(cfg, BASELINE_REVISION)
+    command.upgrade(cfg, revision)
+    return stamped
+
+
+def migrate(args):
+    if upgrade_schema(args.revision):
+        print(f"✅ 既存スキーマをリビジョン {BASELINE_REVISION} として記録しました")
+    print(f"✅ マイグレーションを適用しました（{args.revision}）")
+
+
+def measure_startup(env=None):
+    """
+    別プロセスで app.main を -X importtime 付きで import し、
+    (import時間ms, [(累計us, self us, モジュール名)], 読み込まれたモジュール名の集合) を返す
+    import に失敗した場合は RuntimeError（メッセージは標準エラー出力）
+    """
+    import subprocess
+
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import sys, app.main; print(','.join(sorted(sys.modules)))"],
+        cwd=backend_dir, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr)
+
+    # -X importtime の出力: "import time: self [us] | cumulative | imported package"
+    timings = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        timings.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    total_ms = next((c for c, _, name in timings if name.strip() == "app.main"), 0) / 1000
+    return total_ms, timings, set(proc.stdout.strip().split(","))
+
+
+def check_startup(args):
+    try:
+        total_ms, timings, loaded = measure_startup()
+    except RuntimeError as e:
+        print(e)
+        print("❌ app.main の import に失敗しました")
+        sys.exit(1)
+
+    print(f"app.main import: {total_ms:.0f}ms（予算 {args.budget_ms}ms）")
+    print("self時間の大きいモジュール:")
+    for cumulative_us, self_us, name in sorted(timings, key=lambda t: t[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:7.1f}ms  (累計 {cumulative_us / 1000:7.1f}ms)  {name.strip()}")
+
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    failed = False
+    if eager:
+        print(f"❌ 起動時に読み込まれています（関数内 import に移してください）: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"❌ 起動時間が予算を超えています（{total_ms:.0f}ms > {args.budget_ms}ms）")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ 起動時間は予算内です")
+
+
+def rebuild_rollups(args):
+    from app.revenue_rollup import rebuild_rollups as rebuild
+
+    db = SessionLocal()
+    try:
+        result = rebuild(db, args.start, args.end)
+        db.commit()
+        print(f"✅ ロールアップを再構築しました（日次 {result['daily_rows']}行 / 月次 {result['monthly_rows']}行）")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ エラー: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def recalculate_revenue(args):
+    from app.revenue_batch import recalculate_revenue as recalculate
+
+    db = SessionLocal()
+    try:
+        summary = recalculate(db, args.start, args.end, args.staff_id, args.client_id, args.dry_run)
+        if not args.dry_run:
+            db.commit()
+        label = "（ドライラン・未反映）" if args.dry_run else ""
+        print(f"✅ 売上を再計算しました{label}")
+        print(f"  対象訪問: {summary['visits_scanned']}件")
+        print(f"  更新: {summary['revenues_updated']}件 / 新規: {summary['revenues_created']}件 / 変更なし: {summary['revenues_unchanged']}件")
+        print(f"  売上合計: {summary['amount_before']:,}円 → {summary['amount_after']:,}円（差額 {summary['amount_diff']:+,}円）")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ エラー: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def import_routes(args):
+    from app.excel_import import import_route_workbook
+
+    total_imported = 0
+    total_skipped = 0
+    for path in args.files:
+        db = SessionLocal()
+        try:
+            result = import_route_workbook(db, path, year=args.year, mark_completed=args.completed, dry_run=args.dry_run)
+            if not args.dry_run:
+                db.commit()
+            total_imported += result["imported"]
+            total_skipped += result["skipped"]
+            print(f"✅ {os.path.basename(path)}: {result['sheets']}シート / 取込 {result['imported']}件 / スキップ {result['skipped']}件")
+            for c in result["conflicts"]:
+                print(f"  ⚠ {c['sheet']}!{c['cell']} 「{c['text']}」: {c['reason']}")
+        except Exception as e:
+            db.rollback()
+            print(f"❌ {os.path.basename(path)}: {e}")
+            raise
+        finally:
+            db.close()
+
+    label = "（ドライラン・未反映）" if args.dry_run else ""
+    print(f"合計: 取込 {total_imported}件 / スキップ {total_skipped}件{label}")
+    if args.completed and not args.dry_run:
+        print("売上は recalculate-revenue で作成してください")
+
+
+def bench_login(args):
+    import asyncio
+    import statistics
+    import time
+    from collections import Counter
+    import httpx
+
+    def summarize(latencies):
+        latencies = sorted(latencies)
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+        return f"p50 {statistics.median(latencies) * 1000:.0f}ms / p95 {p95 * 1000:.0f}ms / max {latencies[-1] * 1000:.0f}ms"
+
+    async def run():
+        credentials = {"email": args.email, "password": args.password}
+        # 計測用とログイン用で接続プールを分ける（接続待ちを応答時間に含めないため）
+        limits = httpx.Limits(max_connections=None)
+        async with httpx.AsyncClient(base_url=args.url, timeout=120) as prober, \
+                httpx.AsyncClient(base_url=args.url, timeout=120, limits=limits) as client:
+            r = await client.post("/api/v1/auth/login", json=credentials)
+            r.raise_for_status()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+            async def probe(stop=None):
+                latencies = []
+                while len(latencies) < args.probes or (stop is not None and not stop.done()):
+                    started = time.perf_counter()
+                    (await prober.get(args.probe, headers=headers)).raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+                    await asyncio.sleep(0.02)
+                return latencies
+
+            async def login_once():
+                return (await client.post("/api/v1/auth/login", json=credentials)).status_code
+
+            baseline = await probe()
+            started = time.perf_counter()
+            storm = asyncio.gather(*[login_once() for _ in range(args.logins)])
+            during = await probe(storm)
+            statuses = Counter(await storm)
+            elapsed = time.perf_counter() - started
+
+        print(f"✅ ログイン {args.logins}件を同時送信（{elapsed:.1f}秒）: " + ", ".join(f"{code}: {count}件" for code, count in sorted(statuses.items())))
+        print(f"  {args.probe} 平常時: {summarize(baseline)}")
+        print(f"  {args.probe} ログイン集中時: {summarize(during)}")
+
+    asyncio.run(run())
+
+
+def bench_reads(args):
+    """
+    同じDBに対してレスポンスキャッシュ無効・有効のサーバーを順に起動し、同じ読み取り負荷をかけて比較する
+    キャッシュ有効時のスループットが無効時の --min-ratio 倍未満、またはエラー応答があれば失敗
+    """
+    import asyncio
+    import socket
+    import statistics
+    import subprocess
+    import time
+    from collections import Counter
+    import httpx
+
+    target_date = (args.date or date.today()).isoformat()
+    paths = args.path or [
+        f"/api/v1/visits/?target_date={target_date}",
+        f"/api/v1/routes/?target_date={target_date}",
+        f"/api/v1/routes/progress/{target_date}",
+        f"/api/v1/revenue/summary/{target_date}",
+    ]
+    # キャッシュなし: 件数上限0のプロセス内キャッシュ（保存しても即破棄され、毎回クエリ・シリアライズする）
+    variants = [
+        ("キャッシュなし", {"RESPONSE_CACHE_URL": "memory://", "RESPONSE_CACHE_MAX_ENTRIES": "0"}),
+        ("キャッシュあり", {}),
+    ]
+
+    async def run(base_url):
+        limits = httpx.Limits(max_connections=None)
+        async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+            r = await client.post("/api/v1/auth/login", json={"email": args.email, "password": args.password})
+            r.raise_for_status()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            for path in paths:
+                (await client.get(path, headers=headers)).raise_for_status()
+            latencies = []
+            statuses = Counter()
+            deadline = time.perf_counter() + args.duration
+
+            async def worker(offset):
+                i = offset
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        statuses[(await client.get(paths[i % len(paths)], headers=headers)).status_code] += 1
+                    except httpx.HTTPError as e:
+                        statuses[type(e).__name__] += 1
+                    latencies.append(time.perf_counter() - started)
+                    i += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*[worker(n) for n in range(args.clients)])
+            elapsed = time.perf_counter() - started
+        return sorted(latencies), statuses, elapsed
+
+    def serve(env_overrides):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, **env_overrides}
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"{base_url}/health").raise_for_status()
+                return server, base_url
+            except httpx.HTTPError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    server.kill()
+                    raise RuntimeError("サーバーを起動できませんでした")
+                time.sleep(0.2)
+
+    results = []
+    for label, env_overrides in variants:
+        server, base_url = serve(env_overrides)
+        try:
+            latencies, statuses, elapsed = asyncio.run(run(base_url))
+        finally:
+            server.terminate()
+            server.wait()
+        throughput = len(latencies) / elapsed
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+        results.append((throughput, statistics.median(latencies), statuses))
+        print(f"{label}: {args.clients}並列 / {elapsed:.1f}秒: {throughput:.1f} req/s（" + ", ".join(f"{code}: {count}件" for code, count in statuses.items()) + "）")
+        print(f"  p50 {statistics.median(latencies) * 1000:.0f}ms / p95 {p95 * 1000:.0f}ms / max {latencies[-1] * 1000:.0f}ms")
+
+    (uncached_rps, uncached_p50, _), (cached_rps, cached_p50, _) = results
+    ratio = cached_rps / uncached_rps
+    print(f"スループット比（キャッシュあり / なし）: {ratio:.2f}倍（基準 {args.min_ratio:.2f}倍） / p50 {cached_p50 / uncached_p50:.2f}倍")
+
+    errors = sum(count for _, _, statuses in results for code, count in statuses.items() if code != 200)
+    failed = False
+    if errors:
+        print(f"❌ 200以外の応答・通信エラーが {errors}件あります")
+        failed = True
+    if ratio < args.min_ratio:
+        print(f"❌ キャッシュありのスループットが基準を下回っています（{ratio:.2f}倍 < {args.min_ratio:.2f}倍）")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ キャッシュありのスループットは基準以上です")
+
+
+def bench_compression(args):
+    import statistics
+    import time
+    from sqlalchemy import func
+    from app import models, serializers
+    from app.compression import available_encodings, compress
+    from app.config import settings
+
+    db = SessionLocal()
+    try:
+        target_date = args.date or db.query(models.Visit.date).group_by(models.Visit.date).order_by(
+            func.count().desc()
+        ).limit(1).scalar()
+        if target_date is None:
+            print("❌ 訪問データがありません")
+            return
+        rows = serializers.visit_rows()
+        visits = [rows.to_dict(r) for r in rows.query(db).filter(models.Visit.date == target_date).order_by(
+            models.Visit.scheduled_start, models.Visit.visit_id
+        ).all()]
+        payloads = [(f"訪問一覧 {n}件", serializers.dumps(visits[:n])) for n in sorted({min(n, len(visits)) for n in args.sizes})]
+        if args.xlsx:
+            from app.excel_export import generate_route_excel
+            payloads.append(("ルート表Excel（圧縮対象外）", b"".join(generate_route_excel(db, target_date, include_revenue=True))))
+    finally:
+        db.close()
+
+    methods = [("gzip", level) for level in sorted({1, settings.compression_gzip_level, 9})]
+    if "br" in available_encodings():
+        methods += [("br", quality) for quality in sorted({1, settings.compression_brotli_quality, 11})]
+    defaults = {("gzip", settings.compression_gzip_level), ("br", settings.compression_brotli_quality)}
+
+    print(f"対象日: {target_date} / 圧縮の最小サイズ: {settings.compression_minimum_size:,} bytes（* は現在の設定）")
+    for label, body in payloads:
+        print(f"{label}: {len(body):,} bytes")
+        for encoding, level in methods:
+            timings = []
+            # 遅いレベルは合計1秒で打ち切る
+            while len(timings) < args.repeat and sum(timings) < 1.0:
+                started = time.perf_counter()
+                encoded = compress(body, encoding, level)
+                timings.append(time.perf_counter() - started)
+            elapsed = statistics.median(timings)
+            mark = "*" if (encoding, level) in defaults else " "
+            print(
+                f"  {mark}{encoding:<4} {level:>2}: {len(encoded):>10,} bytes（{len(encoded) / len(body) * 100:5.1f}%）"
+                f" {elapsed * 1000:8.2f}ms/応答  {len(body) / elapsed / 1e6:7.1f}MB/s"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IkaruRoute 運用コマンド")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    mig = subparsers.add_parser("migrate", help="マイグレーションを適用")
+    mig.add_argument("--revision", default="head", help="適用先リビジョン")
+    mig.set_defaults(func=migrate)
+
+    startup = subparsers.add_parser("check-startup", help="起動（import）時間を計測")
+    startup.add_argument("--budget-ms", type=int, default=STARTUP_BUDGET_MS, help="app.main の import に許容する時間（ミリ秒）")
+    startup.add_argument("--top", type=int, default=15, help="表示する上位モジュール数")
+    startup.set_defaults(func=check_startup)
+
+    rollup = subparsers.add_parser("rebuild-rollups", help="売上ロールアップを再構築")
+    rollup.add_argument("--start", type=date.fromisoformat, help="開始日（YYYY-MM-DD）")
+    rollup.add_argument("--end", type=date.fromisoformat, help="終了日（YYYY-MM-DD）")
+    rollup.set_defaults(func=rebuild_rollups)
+
+    recalc = subparsers.add_parser("recalculate-revenue", help="売上を一括再計算")
+    recalc.add_argument("--start", type=date.fromisoformat, required=True, help="開始日（YYYY-MM-DD）")
+    recalc.add_argument("--end", type=date.fromisoformat, required=True, help="終了日（YYYY-MM-DD）")
+    recalc.add_argument("--staff-id", help="スタッフIDで絞り込み")
+    recalc.add_argument("--client-id", help="利用者IDで絞り込み")
+    recalc.add_argument("--dry-run", action="store_true", help="差分の集計のみ行い書き込まない")
+    recalc.set_defaults(func=recalculate_revenue)
+
+    importer = subparsers.add_parser("import-routes", help="過去のルート表Excelを取込")
+    importer.add_argument("files", nargs="+", help="ルート表Excel（.xlsx）")
+    importer.add_argument("--year", type=int, help="シート日付の年（省略時はファイル名の日付から判定）")
+    importer.add_argument("--completed", action="store_true", help="当日より前の訪問を完了扱いで登録")
+    importer.add_argument("--dry-run", action="store_true", help="解析と重複チェックのみ行い書き込まない")
+    importer.set_defaults(func=import_routes)
+
+    bench = subparsers.add_parser("bench-login", help="ログイン集中時の応答時間を計測")
+    bench.add_argument("--url", default="http://localhost:8000", help="APIのURL")
+    bench.add_argument("--email", required=True, help="ログインに使うメールアドレス")
+    bench.add_argument("--password", required=True, help="パスワード")
+    bench.add_argument("--logins", type=int, default=150, help="同時に送るログイン数")
+    bench.add_argument("--probe", default="/api/v1/staff/", help="応答時間を計測するエンドポイント")
+    bench.add_argument("--probes", type=int, default=30, help="最低計測回数")
+    bench.set_defaults(func=bench_login)
+
+    reads = subparsers.add_parser("bench-reads", help="読み取りエンドポイントの同時接続性能をキャッシュ有無で比較")
+    reads.add_argument("--email", required=True, help="ログインに使うメールアドレス")
+    reads.add_argument("--password", required=True, help="パスワード")
+    reads.add_argument("--clients", type=int, default=200, help="同時接続数")
+    reads.add_argument("--duration", type=float, default=15, help="計測時間（秒）")
+    reads.add_argument("--date", type=date.fromisoformat, help="既定のパスの対象日（省略時は本日）")
+    reads.add_argument("--path", action="append", help="計測するパス（複数指定可。省略時は対象日の訪問・ルート・進捗・売上）")
+    reads.add_argument("--min-ratio", type=float, default=BENCH_READS_MIN_RATIO, help="キャッシュあり/なしのスループット比の下限")
+    reads.set_defaults(func=bench_reads)
+
+    comp = subparsers.add_parser("bench-compression", help="レスポンス圧縮の圧縮率とCPU時間を計測")
+    comp.add_argument("--date", type=date.fromisoformat, help="対象日（省略時は訪問件数が最も多い日）")
+    comp.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500, 1000, 2000], help="訪問件数")
+    comp.add_argument("--repeat", type=int, default=20, help="1方式あたりの最大計測回数")
+    comp.add_argument("--xlsx", action="store_true", help="同日のルート表Excelも計測（圧縮済み形式であることの確認用）")
+    comp.set_defaults(func=bench_compression)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+テスト共通設定
+
+- 一時ディレクトリのSQLiteファイルにテーブルを作成して使う（同期・非同期エンジンで同じDBを参照するためファイル）
+- データ作成・トークン発行・SQL文数の計測は tests/helpers.py
+"""
+import os
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp(prefix="ikaruRoute-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}"
+os.environ["REPORT_CACHE_DIR"] = os.path.join(_tmp_dir, "reports")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import Base, SessionLocal, engine
+from app.response_cache import response_cache
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    Base.metadata.create_all(bind=engine)
+    yield
+    engine.dispose()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def client(schema):
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    response_cache.clear()
+    yield
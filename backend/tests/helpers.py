@@ -0,0 +1,87 @@
+"""
+テスト用のデータ作成・認証・SQL文数の計測
+
+- ログインはパスワードハッシュのプロセスプールを使わず、トークンを直接発行する
+- count_queries() で発行されたSQL文を集める（同期・非同期どちらのエンジンも対象）
+"""
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import models
+from app.auth import create_access_token
+
+
+def auth_headers(staff: models.Staff) -> dict:
+    token = create_access_token({"sub": str(staff.staff_id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@contextmanager
+def count_queries():
+    """ブロック内で実行されたSQL文を集める（len() で件数）"""
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+def make_staff(db, role=models.RoleEnum.staff, name=None) -> models.Staff:
+    staff = models.Staff(
+        name=name or f"スタッフ{uuid.uuid4().hex[:6]}",
+        email=f"{uuid.uuid4().hex}@example.com",
+        hashed_password="-",
+        role=role,
+        skill_types=["身体"],
+    )
+    db.add(staff)
+    db.flush()
+    return staff
+
+
+def make_client(db) -> models.Client:
+    client = models.Client(
+        name=f"利用者{uuid.uuid4().hex[:6]}",
+        address="東京都練馬区1-1-1",
+        care_level="要介護1",
+        service_type=models.ServiceTypeEnum.shintai.value,
+        visit_duration=60,
+    )
+    db.add(client)
+    db.flush()
+    return client
+
+
+def make_day(db, target_date: date, staff_count: int, visits_per_staff: int) -> List[models.Staff]:
+    """1日分のルート・訪問（一部完了・中止）を作成して commit"""
+    staff_list = [make_staff(db) for _ in range(staff_count)]
+    clients = [make_client(db) for _ in range(3)]
+    statuses = [models.VisitStatusEnum.scheduled, models.VisitStatusEnum.completed, models.VisitStatusEnum.cancelled]
+    for staff in staff_list:
+        route = models.Route(date=target_date, staff_id=staff.staff_id)
+        db.add(route)
+        db.flush()
+        for i in range(visits_per_staff):
+            start = datetime.combine(target_date, datetime.min.time()) + timedelta(hours=8 + i)
+            db.add(models.Visit(
+                route_id=route.route_id,
+                staff_id=staff.staff_id,
+                client_id=clients[i % len(clients)].client_id,
+                scheduled_start=start,
+                scheduled_end=start + timedelta(hours=1),
+                service_type=models.ServiceTypeEnum.shintai.value,
+                status=statuses[i % len(statuses)].value,
+                date=target_date,
+            ))
+    db.commit()
+    return staff_list
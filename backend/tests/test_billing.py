@@ -0,0 +1,49 @@
+"""月次介護報酬計算の入力検証（単位表にないサービス種別・未定義の地域区分は400）"""
+from datetime import date, datetime, timedelta
+
+from app import models
+from app.config import settings
+from tests.helpers import auth_headers, make_client, make_staff
+
+
+def _completed_visit(db, staff, target_date: date, service_type: str) -> models.Visit:
+    start = datetime.combine(target_date, datetime.min.time()) + timedelta(hours=9)
+    visit = models.Visit(
+        staff_id=staff.staff_id,
+        client_id=make_client(db).client_id,
+        scheduled_start=start,
+        scheduled_end=start + timedelta(hours=1),
+        actual_start=start,
+        actual_end=start + timedelta(hours=1),
+        service_type=service_type,
+        status=models.VisitStatusEnum.completed,
+        date=target_date,
+    )
+    db.add(visit)
+    db.commit()
+    return visit
+
+
+def test_unknown_service_type_is_rejected(client, db):
+    admin = make_staff(db, role=models.RoleEnum.admin)
+    _completed_visit(db, admin, date(2026, 5, 12), models.ServiceTypeEnum.shintai.value)
+    _completed_visit(db, admin, date(2026, 5, 13), "通院")
+
+    response = client.get("/api/v1/billing/monthly/2026-05", headers=auth_headers(admin))
+
+    assert response.status_code == 400
+    assert "通院" in response.json()["detail"]
+
+
+def test_unknown_area_grade_is_rejected(client, db, monkeypatch):
+    admin = make_staff(db, role=models.RoleEnum.admin)
+    _completed_visit(db, admin, date(2026, 6, 12), models.ServiceTypeEnum.shintai.value)
+    headers = auth_headers(admin)
+
+    assert client.get("/api/v1/billing/monthly/2026-06", headers=headers).status_code == 200
+
+    monkeypatch.setattr(settings, "billing_area_grade", "9級地")
+    response = client.get("/api/v1/billing/monthly/2026-06", headers=headers)
+
+    assert response.status_code == 400
+    assert "9級地" in response.json()["detail"]
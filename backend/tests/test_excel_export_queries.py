@@ -0,0 +1,56 @@
+"""日次ルート表Excel（load_route_report_data / GET /api/v1/reports/excel/{date}）のSQL文数"""
+from datetime import date
+
+import pytest
+
+from app import models
+from app.database import SessionLocal
+from app.excel_export import load_route_report_data
+from tests.helpers import auth_headers, count_queries, make_day, make_staff
+
+SMALL_DAY = date(2026, 5, 1)
+LARGE_DAY = date(2026, 5, 2)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def report_days():
+    session = SessionLocal()
+    try:
+        make_day(session, SMALL_DAY, staff_count=1, visits_per_staff=2)
+        make_day(session, LARGE_DAY, staff_count=10, visits_per_staff=8)
+    finally:
+        session.close()
+
+
+@pytest.mark.parametrize("include_revenue, expected", [(False, 3), (True, 4)])
+def test_load_route_report_data_query_count(db, include_revenue, expected):
+    with count_queries() as small_statements:
+        small = load_route_report_data(db, SMALL_DAY, include_revenue)
+    with count_queries() as large_statements:
+        large = load_route_report_data(db, LARGE_DAY, include_revenue)
+
+    assert sum(len(row.visits) for row in small.staff) == 2
+    assert sum(len(row.visits) for row in large.staff) == 80
+    assert len(small_statements) == expected
+    assert len(large_statements) == expected
+
+
+def test_excel_download_query_count(client, db):
+    admin = make_staff(db, role=models.RoleEnum.admin)
+    db.commit()
+    headers = auth_headers(admin)
+    client.get("/api/v1/routes/progress/2026-01-01", headers=headers)
+
+    url = f"/api/v1/reports/excel/{LARGE_DAY.isoformat()}"
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.content[:2] == b"PK"
+    # データバージョン + 全シート分の取得（売上あり）
+    assert len(statements) == 1 + 4
+
+    # 生成済みファイルがあればデータバージョンの確認のみ
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert len(statements) == 1
@@ -0,0 +1,27 @@
+"""ガントチャート用の列指向データ（GET /api/v1/routes/gantt）"""
+import json
+from datetime import date
+
+from app import models
+from tests.helpers import auth_headers, make_day, make_staff
+
+DAY = date(2026, 8, 10)
+
+
+def test_gantt_payload(client, db):
+    staff = make_day(db, DAY, staff_count=2, visits_per_staff=3)
+    admin = make_staff(db, role=models.RoleEnum.admin)
+    db.commit()
+
+    response = client.get("/api/v1/routes/gantt", params={"target_date": DAY.isoformat()}, headers=auth_headers(admin))
+
+    assert response.status_code == 200
+    payload = response.json()
+    # 空白なし・日本語はそのまま（UTF-8）
+    assert response.content == json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    assert len(payload["visits"]["visit_id"]) == 6
+    assert sorted(payload["staff"]["staff_id"]) == sorted(s.staff_id for s in staff)
+    assert payload["visits"]["start"][0] == 8 * 60
+    assert payload["visits"]["duration"] == [60] * 6
+    statuses = [payload["statuses"][i] for i in payload["visits"]["status"]]
+    assert statuses.count(models.VisitStatusEnum.completed) == 2
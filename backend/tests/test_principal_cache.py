@@ -0,0 +1,24 @@
+"""認証結果のキャッシュ（auth.principal_cache）"""
+from app import models
+from tests.helpers import auth_headers, count_queries, make_staff
+
+PROGRESS_URL = "/api/v1/routes/progress/2026-08-01"
+
+
+def test_cached_principal_skips_lookup_and_is_invalidated(client, db):
+    admin = make_staff(db, role=models.RoleEnum.admin)
+    staff = make_staff(db)
+    db.commit()
+    headers = auth_headers(staff)
+
+    with count_queries() as first:
+        assert client.get(PROGRESS_URL, headers=headers).status_code == 200
+    with count_queries() as second:
+        assert client.get(PROGRESS_URL, headers=headers).status_code == 200
+    # 2回目はスタッフの確認クエリなし
+    assert any("FROM staff" in statement for statement in first)
+    assert not any("FROM staff" in statement for statement in second)
+
+    response = client.delete(f"/api/v1/staff/{staff.staff_id}", headers=auth_headers(admin))
+    assert response.status_code == 204
+    assert client.get(PROGRESS_URL, headers=headers).status_code == 401
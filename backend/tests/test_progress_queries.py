@@ -0,0 +1,81 @@
+"""日次進捗率API（GET /api/v1/routes/progress/{date}）のSQL文数"""
+from datetime import date
+
+from app import models
+from tests.helpers import auth_headers, count_queries, make_day, make_staff
+
+# データバージョン取得 + スタッフ×ステータス集計（訪問・スタッフ数によらない）
+PROGRESS_QUERIES = 2
+
+SMALL_DAY = date(2026, 4, 1)
+LARGE_DAY = date(2026, 4, 2)
+
+
+def _progress(client, headers, target_date):
+    with count_queries() as statements:
+        response = client.get(f"/api/v1/routes/progress/{target_date.isoformat()}", headers=headers)
+    assert response.status_code == 200
+    return response.json(), statements
+
+
+def test_progress_query_count_is_constant(client, db):
+    make_day(db, SMALL_DAY, staff_count=1, visits_per_staff=3)
+    make_day(db, LARGE_DAY, staff_count=8, visits_per_staff=6)
+    admin = make_staff(db, role=models.RoleEnum.admin)
+    db.commit()
+    headers = auth_headers(admin)
+    # 認証結果のキャッシュを温めておく
+    client.get("/api/v1/routes/progress/2026-01-01", headers=headers)
+
+    small, small_statements = _progress(client, headers, SMALL_DAY)
+    large, large_statements = _progress(client, headers, LARGE_DAY)
+
+    assert small["total_visits"] == 3
+    assert large["total_visits"] == 48
+    assert len(large["staff_progress"]) == 8
+    assert len(small_statements) == PROGRESS_QUERIES
+    assert len(large_statements) == PROGRESS_QUERIES
+
+
+def test_progress_query_count_for_staff(client, db):
+    staff = make_day(db, date(2026, 4, 3), staff_count=4, visits_per_staff=6)[0]
+    headers = auth_headers(staff)
+    client.get("/api/v1/routes/progress/2026-01-01", headers=headers)
+
+    body, statements = _progress(client, headers, date(2026, 4, 3))
+
+    assert body["total_visits"] == 6
+    assert [row["staff_id"] for row in body["staff_progress"]] == [staff.staff_id]
+    assert len(statements) == PROGRESS_QUERIES
+
+
+def test_progress_not_modified_skips_aggregation(client, db):
+    admin = make_staff(db, role=models.RoleEnum.admin)
+    db.commit()
+    headers = auth_headers(admin)
+    first = client.get(f"/api/v1/routes/progress/{LARGE_DAY.isoformat()}", headers=headers)
+
+    with count_queries() as statements:
+        response = client.get(
+            f"/api/v1/routes/progress/{LARGE_DAY.isoformat()}",
+            headers={**headers, "If-None-Match": first.headers["etag"]},
+        )
+
+    assert response.status_code == 304
+    assert len(statements) == 1
+
+
+def test_progress_etag_differs_between_dates(client, db):
+    admin = make_staff(db, role=models.RoleEnum.admin)
+    db.commit()
+    headers = auth_headers(admin)
+    # どちらも未更新の日付（データバージョンが同じ）
+    first = client.get("/api/v1/routes/progress/2026-09-01", headers=headers)
+
+    response = client.get(
+        "/api/v1/routes/progress/2026-09-02",
+        headers={**headers, "If-None-Match": first.headers["etag"]},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["date"] == "2026-09-02"
@@ -0,0 +1,106 @@
+"""進捗SSE（GET /api/v1/routes/progress/{date}/stream）の初期イベントと差分"""
+import asyncio
+import json
+from datetime import date
+
+from starlette.requests import Request
+
+from app import models, schemas
+from app.auth import Principal
+from app.database import SessionLocal
+from app.routers import routes
+from app.routers.routes import stream_progress
+from app.routers.visits import update_visit
+from tests.helpers import auth_headers, make_day, make_staff
+
+DAY = date(2026, 7, 1)
+RACE_DAY = date(2026, 7, 2)
+
+
+def _read_events(principal: Principal) -> list:
+    """接続直後に送られるイベント（切断済みのリクエストで購読し、送信済みの分だけ読む）"""
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def run():
+        request = Request({"type": "http", "method": "GET", "path": "/", "headers": []}, receive)
+        response = await stream_progress(DAY, request, principal)
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    return [event for event in asyncio.run(run()).split("\n\n") if event]
+
+
+def test_stream_starts_with_progress_snapshot(client, db):
+    staff = make_day(db, DAY, staff_count=2, visits_per_staff=3)[0]
+    admin = make_staff(db, role=models.RoleEnum.admin)
+    db.commit()
+
+    for user in (admin, staff):
+        expected = client.get(f"/api/v1/routes/progress/{DAY.isoformat()}", headers=auth_headers(user)).json()
+        events = _read_events(Principal(staff_id=str(user.staff_id), role=user.role, name=user.name))
+
+        assert events[0] == "retry: 3000"
+        name, data = events[1].split("\n")
+        assert name == "event: progress"
+        assert json.loads(data[len("data: "):]) == expected
+
+
+def _event_data(event: str, name: str) -> dict:
+    event_name, data = event.split("\n")
+    assert event_name == f"event: {name}"
+    return json.loads(data[len("data: "):])
+
+
+def test_delta_published_during_snapshot_is_counted_once(client, db, monkeypatch):
+    make_day(db, RACE_DAY, staff_count=1, visits_per_staff=6)
+    admin = make_staff(db, role=models.RoleEnum.admin)
+    db.commit()
+    headers = auth_headers(admin)
+    visits = client.get("/api/v1/visits/", params={"target_date": RACE_DAY.isoformat()}, headers=headers).json()
+    scheduled = [v["visit_id"] for v in visits if v["status"] == models.VisitStatusEnum.scheduled]
+    principal = Principal(staff_id=str(admin.staff_id), role=admin.role, name=admin.name)
+
+    def complete(visit_id):
+        # イベントループのスレッドからも呼ぶため TestClient ではなくハンドラを直接呼ぶ
+        session = SessionLocal()
+        try:
+            update_visit(visit_id, schemas.VisitUpdate(status=models.VisitStatusEnum.completed), session, principal)
+        finally:
+            session.close()
+
+    # 全体の取得中に別の更新がコミット・配信される（変更は全体に含まれ、差分も購読キューに届く）
+    original = routes._progress_snapshot
+
+    def snapshot_during_update(session, *args):
+        complete(scheduled[0])
+        return original(session, *args)
+
+    monkeypatch.setattr(routes, "_progress_snapshot", snapshot_during_update)
+
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def run():
+        request = Request({"type": "http", "method": "GET", "path": "/", "headers": []}, receive)
+        response = await stream_progress(RACE_DAY, request, principal)
+        events = response.body_iterator
+        assert await events.__anext__() == "retry: 3000\n\n"
+        snapshot = _event_data((await events.__anext__()).strip(), "progress")
+        # 全体の送信後の更新は差分で届く
+        await asyncio.to_thread(complete, scheduled[1])
+        delta = _event_data((await events.__anext__()).strip(), "progress_delta")
+        disconnected.set()
+        await events.aclose()
+        return snapshot, delta
+
+    snapshot, delta = asyncio.run(run())
+
+    assert delta["visit_id"] == scheduled[1]
+    completed = snapshot["completed_visits"]
+    completed += (delta["new_status"] == models.VisitStatusEnum.completed) - (delta["old_status"] == models.VisitStatusEnum.completed)
+    expected = client.get(f"/api/v1/routes/progress/{RACE_DAY.isoformat()}", headers=headers).json()
+    assert expected["completed_visits"] == 4
+    assert completed == expected["completed_visits"]
@@ -0,0 +1,45 @@
+"""月次評価・期間ランキングの稼働時間（同行スタッフの売上分を含めない）"""
+from datetime import date, datetime, timedelta
+
+from app import models
+from tests.helpers import auth_headers, make_client, make_staff
+
+DAY = date(2026, 3, 10)
+
+
+def test_two_staff_visit_hours_are_credited_to_primary_staff_only(client, db):
+    admin = make_staff(db, role=models.RoleEnum.admin)
+    primary = make_staff(db)
+    companion = make_staff(db)
+    start = datetime.combine(DAY, datetime.min.time()) + timedelta(hours=9)
+    visit = models.Visit(
+        staff_id=primary.staff_id,
+        companion_staff_id=companion.staff_id,
+        client_id=make_client(db).client_id,
+        scheduled_start=start,
+        scheduled_end=start + timedelta(minutes=90),
+        service_type=models.ServiceTypeEnum.shintai.value,
+        visit_type="two_staff",
+        date=DAY,
+    )
+    db.add(visit)
+    db.commit()
+    headers = auth_headers(admin)
+
+    response = client.put(f"/api/v1/visits/{visit.visit_id}", headers=headers, json={
+        "status": models.VisitStatusEnum.completed.value,
+        "actual_start": start.isoformat(),
+        "actual_end": (start + timedelta(minutes=90, seconds=30)).isoformat(),
+    })
+    assert response.status_code == 200
+
+    monthly = {row["staff_id"]: row for row in client.get("/api/v1/revenue/monthly/2026-03", headers=headers).json()}
+    ranking = {row["staff_id"]: row for row in client.get(
+        "/api/v1/revenue/ranking", params={"from_month": "2026-01", "to_month": "2026-03"}, headers=headers
+    ).json()}
+
+    for rows in (monthly, ranking):
+        assert rows[primary.staff_id]["total_hours"] == 1.5
+        # 同行スタッフにも売上は計上されるが、稼働時間は担当スタッフのみ
+        assert rows[companion.staff_id]["visit_count"] == 1
+        assert rows[companion.staff_id]["total_hours"] == 0
@@ -0,0 +1,18 @@
+"""app.main の import（起動時間の予算・重い依存・DB接続）"""
+import os
+
+from manage import LAZY_MODULES, STARTUP_BUDGET_MS, measure_startup
+
+
+def test_import_app_main_within_startup_budget(tmp_path):
+    db_path = tmp_path / "startup.db"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "REPORT_CACHE_DIR": str(tmp_path / "reports")}
+    env.pop("AUTO_CREATE_SCHEMA", None)
+
+    total_ms, timings, loaded = measure_startup(env)
+
+    assert timings, "-X importtime の出力を読み取れませんでした"
+    assert 0 < total_ms <= STARTUP_BUDGET_MS
+    assert [m for m in LAZY_MODULES if m in loaded] == []
+    # スキーマ作成は manage.py migrate で行い、import 時にはDBへ接続しない
+    assert not db_path.exists()
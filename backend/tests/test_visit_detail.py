@@ -0,0 +1,24 @@
+"""訪問1件取得（GET /api/v1/visits/{visit_id}）"""
+from datetime import date
+
+from app import models
+from tests.helpers import auth_headers, make_day, make_staff
+
+DAY = date(2026, 6, 1)
+
+
+def test_get_visit_matches_list_item(client, db):
+    owner, other = make_day(db, DAY, staff_count=2, visits_per_staff=2)
+    admin = make_staff(db, role=models.RoleEnum.admin)
+    db.commit()
+    listed = client.get("/api/v1/visits/", params={"target_date": DAY.isoformat()}, headers=auth_headers(admin)).json()
+    visit = next(v for v in listed if v["staff_id"] == owner.staff_id)
+
+    response = client.get(f"/api/v1/visits/{visit['visit_id']}", headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert response.json() == visit
+    assert response.json()["client"]["address"]
+
+    assert client.get(f"/api/v1/visits/{visit['visit_id']}", headers=auth_headers(owner)).status_code == 200
+    assert client.get(f"/api/v1/visits/{visit['visit_id']}", headers=auth_headers(other)).status_code == 403
+    assert client.get("/api/v1/visits/unknown", headers=auth_headers(admin)).status_code == 404
@@ -5,7 +5,7 @@ import { useRouter } from 'next/navigation';
 import { format, addDays, subDays } from 'date-fns';
 import { ja } from 'date-fns/locale';
 import { useAuth } from '@/lib/auth-context';
-import { staffApi, visitApi, routeApi, revenueApi, reportApi, Staff, Visit, RevenueSummary, ProgressData } from '@/lib/api';
+import { staffApi, visitApi, routeApi, revenueApi, reportApi, subscribeProgress, applyProgressDelta, decodeGantt, Staff, Visit, RevenueSummary, ProgressData } from '@/lib/api';
 import GanttChart from '@/components/gantt/GanttChart';
 import VisitModal from '@/components/gantt/VisitModal';
 import RevenuePanel from '@/components/revenue/RevenuePanel';
@@ -37,14 +37,14 @@ export default function RoutePage() {
     const loadData = useCallback(async () => {
         setIsLoading(true);
         try {
-            const [staffRes, visitsRes, unassignedRes, progressRes] = await Promise.all([
+            const [staffRes, ganttRes, unassignedRes, progressRes] = await Promise.all([
                 staffApi.list(),
-                visitApi.list(dateStr),
+                routeApi.gantt(dateStr),
                 isCoordinatorOrAbove ? visitApi.list(dateStr, undefined, true) : Promise.resolve({ data: [] }),
                 routeApi.progress(dateStr),
             ]);
             setStaffList(staffRes.data);
-            setVisits(visitsRes.data);
+            setVisits(decodeGantt(ganttRes.data));
             setUnassignedVisits(unassignedRes.data);
             setProgress(progressRes.data);
 
@@ -66,12 +66,30 @@ export default function RoutePage() {
         loadData();
     }, [user, loadData, router]);
 
+    // 進捗はポーリングせずSSEで更新（接続・再接続時の全体で置き換え、以降は差分を適用）
+    useEffect(() => {
+        if (!user) return;
+        return subscribeProgress(dateStr, setProgress, delta => {
+            setProgress(prev => (prev ? applyProgressDelta(prev, delta) : prev));
+        });
+    }, [user, dateStr]);
+
     const addAlert = (type: Alert['type'], message: string) => {
         const id = Math.random().toString(36).slice(2);
         setAlerts(prev => [...prev, { id, type, message }]);
         setTimeout(() => setAlerts(prev => prev.filter(a => a.id !== id)), 5000);
     };
 
+    // ガントチャートのデータ（列指向）には住所・メモがないため、詳細を取得してから開く
+    const openVisit = async (visit: Visit) => {
+        try {
+            const res = await visitApi.get(visit.visit_id);
+            setSelectedVisit(res.data);
+        } catch {
+            addAlert('error', '訪問情報の取得に失敗しました');
+        }
+    };
+
     const handleVisitMove = async (visitId: string, newStaffId: string, newStart: string, newEnd: string) => {
         try {
             await visitApi.update(visitId, { staff_id: newStaffId, scheduled_start: newStart, scheduled_end: newEnd });
@@ -372,7 +390,7 @@ export default function RoutePage() {
                             <GanttChart
                                 staffList={staffList}
                                 visits={visits.filter(v => v.staff_id)}
-                                onVisitClick={setSelectedVisit}
+                                onVisitClick={openVisit}
                                 onVisitMove={handleVisitMove}
                                 targetDate={dateStr}
                             />
@@ -84,6 +84,171 @@ export interface ProgressData {
     }>;
 }
 
+export interface ProgressDelta {
+    type: 'progress_delta';
+    date: string;
+    visit_id: string;
+    staff_id: string | null;
+    staff_name: string | null;
+    old_status: string | null;  // null = 訪問追加
+    new_status: string | null;  // null = 訪問削除
+    version: number | null;     // コミット時点の日付側データバージョン
+}
+
+const COMPLETED = '完了';
+const CANCELLED = '中止';
+
+// 進捗差分を現在の進捗データへ適用
+export const applyProgressDelta = (progress: ProgressData, delta: ProgressDelta): ProgressData => {
+    const count = (status: string | null, target: string) =>
+        (status === target ? 1 : 0);
+    const dTotal = (delta.new_status ? 1 : 0) - (delta.old_status ? 1 : 0);
+    const dCompleted = count(delta.new_status, COMPLETED) - count(delta.old_status, COMPLETED);
+    const dCancelled = count(delta.new_status, CANCELLED) - count(delta.old_status, CANCELLED);
+    const rate = (completed: number, total: number) =>
+        (total > 0 ? Math.round(completed / total * 1000) / 10 : 0);
+
+    const total = progress.total_visits + dTotal;
+    const completed = progress.completed_visits + dCompleted;
+
+    let staffProgress = progress.staff_progress;
+    if (delta.staff_id) {
+        const exists = staffProgress.some(s => s.staff_id === delta.staff_id);
+        if (!exists) {
+            staffProgress = [...staffProgress, {
+                staff_id: delta.staff_id, staff_name: delta.staff_name || '', total: 0, completed: 0, rate: 0,
+            }];
+        }
+        staffProgress = staffProgress
+            .map(s => {
+                if (s.staff_id !== delta.staff_id) return s;
+                const sTotal = s.total + dTotal;
+                const sCompleted = s.completed + dCompleted;
+                return { ...s, total: sTotal, completed: sCompleted, rate: rate(sCompleted, sTotal) };
+            })
+            .filter(s => s.total > 0);
+    }
+
+    return {
+        ...progress,
+        total_visits: total,
+        completed_visits: completed,
+        cancelled_visits: progress.cancelled_visits + dCancelled,
+        progress_rate: rate(completed, total),
+        staff_progress: staffProgress,
+    };
+};
+
+// ガントチャート用の列指向データ（GET /api/v1/routes/gantt）
+export interface GanttPayload {
+    start_date: string;
+    end_date: string;
+    base: string;
+    service_types: string[];
+    statuses: string[];
+    visit_types: string[];
+    staff: { staff_id: string[]; name: string[] };
+    clients: { client_id: string[]; name: string[] };
+    visits: {
+        visit_id: string[];
+        start: number[];
+        duration: number[];
+        actual_start: (number | null)[];
+        actual_duration: (number | null)[];
+        staff: number[];
+        companion: number[];
+        client: number[];
+        service: number[];
+        status: number[];
+        visit_type: number[];
+    };
+}
+
+// 列指向データを GanttChart が扱う Visit 配列に展開
+export const decodeGantt = (payload: GanttPayload): Visit[] => {
+    const base = new Date(payload.base).getTime();
+    const toIso = (minutes: number) => {
+        const d = new Date(base + minutes * 60000);
+        const pad = (n: number) => n.toString().padStart(2, '0');
+        return `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}T${pad(d.getHours())}:${pad(d.getMinutes())}:00`;
+    };
+    const staffRef = (i: number) => i < 0 ? undefined
+        : { staff_id: payload.staff.staff_id[i], name: payload.staff.name[i], role: '' };
+    const v = payload.visits;
+
+    return v.visit_id.map((visitId, i) => {
+        const actualStart = v.actual_start[i];
+        const actualDuration = v.actual_duration[i];
+        const start = toIso(v.start[i]);
+        return {
+            visit_id: visitId,
+            client_id: payload.clients.client_id[v.client[i]],
+            staff_id: staffRef(v.staff[i])?.staff_id,
+            companion_staff_id: staffRef(v.companion[i])?.staff_id,
+            scheduled_start: start,
+            scheduled_end: toIso(v.start[i] + v.duration[i]),
+            actual_start: actualStart == null ? undefined : toIso(actualStart),
+            actual_end: actualStart == null || actualDuration == null ? undefined : toIso(actualStart + actualDuration),
+            service_type: payload.service_types[v.service[i]],
+            visit_type: payload.visit_types[v.visit_type[i]],
+            status: payload.statuses[v.status[i]],
+            date: start.slice(0, 10),
+            client: { client_id: payload.clients.client_id[v.client[i]], name: payload.clients.name[v.client[i]], address: '', service_type: '' },
+            staff: staffRef(v.staff[i]),
+            companion_staff: staffRef(v.companion[i]),
+        };
+    });
+};
+
+// 進捗差分のSSE購読（Authorizationヘッダーを送るためEventSourceではなくfetchで受信）
+// 接続・再接続のたびにサーバーが最初に進捗全体（progress イベント）を送るため、onSnapshot で置き換えてから差分を適用する
+export const subscribeProgress = (
+    date: string,
+    onSnapshot: (progress: ProgressData) => void,
+    onDelta: (delta: ProgressDelta) => void,
+) => {
+    const controller = new AbortController();
+
+    const connect = async () => {
+        while (!controller.signal.aborted) {
+            try {
+                const token = localStorage.getItem('ikaruRoute_token');
+                const response = await fetch(`${API_URL}/api/v1/routes/progress/${date}/stream`, {
+                    headers: token ? { Authorization: `Bearer ${token}` } : {},
+                    signal: controller.signal,
+                });
+                if (!response.ok || !response.body) throw new Error(`stream ${response.status}`);
+
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                for (;;) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+                    const events = buffer.split('\n\n');
+                    buffer = events.pop() || '';
+                    for (const event of events) {
+                        const lines = event.split('\n');
+                        const name = lines.find(line => line.startsWith('event: '))?.slice(7);
+                        const data = lines.find(line => line.startsWith('data: '));
+                        if (!data) continue;
+                        if (name === 'progress') onSnapshot(JSON.parse(data.slice(6)));
+                        else onDelta(JSON.parse(data.slice(6)));
+                    }
+                }
+            } catch {
+                if (controller.signal.aborted) return;
+            }
+            // 切断時は3秒後に再接続
+            await new Promise(resolve => setTimeout(resolve, 3000));
+        }
+    };
+
+    connect();
+    return () => controller.abort();
+};
+
 // ===== API関数 =====
 export const staffApi = {
     list: () => api.get<Staff[]>('/api/v1/staff/'),
@@ -102,6 +267,20 @@ export const clientApi = {
 export const visitApi = {
     list: (date: string, staffId?: string, unassigned?: boolean) =>
         api.get<Visit[]>('/api/v1/visits/', { params: { target_date: date, staff_id: staffId, unassigned } }),
+    // 期間指定（週・月表示用）。X-Next-Cursor がなくなるまでページを取得
+    listRange: async (startDate: string, endDate: string, staffId?: string, pageSize = 500) => {
+        const visits: Visit[] = [];
+        let cursor: string | undefined;
+        do {
+            const res = await api.get<Visit[]>('/api/v1/visits/', {
+                params: { start_date: startDate, end_date: endDate, staff_id: staffId, limit: pageSize, cursor },
+            });
+            visits.push(...res.data);
+            cursor = res.headers['x-next-cursor'] || undefined;
+        } while (cursor);
+        return visits;
+    },
+    get: (id: string) => api.get<Visit>(`/api/v1/visits/${id}`),
     create: (data: any) => api.post<Visit>('/api/v1/visits/', data),
     update: (id: string, data: any) => api.put<Visit>(`/api/v1/visits/${id}`, data),
     delete: (id: string) => api.delete(`/api/v1/visits/${id}`),
@@ -112,6 +291,8 @@ export const routeApi = {
     generate: (date: string, staffIds?: string[]) =>
         api.post('/api/v1/routes/generate', { date, staff_ids: staffIds }),
     progress: (date: string) => api.get<ProgressData>(`/api/v1/routes/progress/${date}`),
+    gantt: (startDate: string, endDate: string = startDate) =>
+        api.get<GanttPayload>('/api/v1/routes/gantt', { params: { start_date: startDate, end_date: endDate } }),
 };
 
 export const revenueApi = {